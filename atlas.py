@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from backend import file_hash, file_stat, read_png, write_png
+
+
+ATLAS_WIDTH = 1024  # width of the atlas image, sprites are placed in rows
+PADDING = 1  # empty pixels between 2 sprites
+
+
+def find_sprites(assets_directory):
+    """
+Returns the paths of all the PNG files inside `assets_directory` (and its
+subfolders), except the atlas itself, sorted by name
+    """
+    assets_directory = Path(assets_directory)
+    return sorted(
+        path for path in assets_directory.rglob("*.png")
+        if path.name != "atlas.png"
+    )
+
+
+def pack_sprites(sizes, atlas_width=ATLAS_WIDTH, padding=PADDING):
+    """
+- Places rectangles of the given `sizes` (a dict of name: (width, height))
+  into rows (shelves) of an image `atlas_width` pixels wide
+    - the tallest sprites are placed first, from left to right, and a new
+      row is started below whenever the next sprite doesn't fit
+- Returns `(positions, height)`, where `positions` is a dict of
+  name: (x, y) and `height` is the height the atlas image needs
+    """
+    positions = {}
+    x = y = row_height = 0
+
+    for name, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if width > atlas_width:
+            raise ValueError(f"{name} is wider than the atlas ({width} > {atlas_width})")
+
+        if x + width > atlas_width:
+            x = 0
+            y += row_height + padding
+            row_height = 0
+
+        positions[name] = (x, y)
+        x += width + padding
+        row_height = max(row_height, height)
+
+    return positions, y + row_height
+
+
+def build_atlas(assets_directory, atlas_width=ATLAS_WIDTH):
+    """
+- Packs every sprite found by `find_sprites()` into one image and writes:
+    - `atlas.png`: the atlas image
+    - `atlas.json`: the index, storing the size of the atlas and the
+      rectangle `[x, y, width, height]` of every sprite inside it, by its
+      path relative to `assets_directory` (like `"birds/1_bird.png"`),
+      and the size, modification time and hash of every sprite's own
+      file (see `backend.file_stat()` and `backend.file_hash()`)
+- Both files are written into `assets_directory`
+- `Backend` loads these 2 files once and cuts the sprites out of them
+  instead of reading and decoding every PNG file separately
+
+Returns the index as a dict
+    """
+    assets_directory = Path(assets_directory)
+    sprites = {}
+    for path in find_sprites(assets_directory):
+        sprites[path.relative_to(assets_directory).as_posix()] = read_png(path)
+
+    sizes = {name: (width, height) for name, (width, height, _) in sprites.items()}
+    positions, atlas_height = pack_sprites(sizes, atlas_width)
+
+    pixels = bytearray(atlas_width * atlas_height * 4)
+    for name, (width, height, sprite_pixels) in sprites.items():
+        x, y = positions[name]
+        for row in range(height):
+            start = ((y + row) * atlas_width + x) * 4
+            pixels[start:start + width*4] = sprite_pixels[row*width*4:(row+1)*width*4]
+
+    write_png(assets_directory / "atlas.png", atlas_width, atlas_height, pixels)
+
+    index = {
+        "size": [atlas_width, atlas_height],
+        "sprites": {
+            name: [*positions[name], *sizes[name]] for name in sorted(sprites)
+        },
+        "file_stats": {
+            name: file_stat(assets_directory / name) for name in sorted(sprites)
+        },
+        "file_hashes": {
+            name: file_hash(assets_directory / name) for name in sorted(sprites)
+        }
+    }
+    with open(assets_directory / "atlas.json", "w") as file:
+        json.dump(index, file, indent=4)
+
+    return index
+
+
+if __name__ == '__main__':
+    # run `python atlas.py` from the game's folder after changing any file in assets/
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+    atlas_index = build_atlas(directory)
+    print(f"packed {len(atlas_index['sprites'])} sprites into a {atlas_index['size'][0]}x{atlas_index['size'][1]} atlas")
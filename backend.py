@@ -1,8 +1,44 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tkinter import PhotoImage
+from tkinter import PhotoImage, TclError
+import atexit
+import hashlib
+import json
 import os
 import platform
+import sqlite3
+import struct
 import sys
+import zlib
+
+import collision
+import leaderboard
+import performance
+from writer import BackgroundWriter
+
+
+def file_stat(path):
+    """
+- Returns `[size, mtime]` of the file at `path` (the modification time in
+  nanoseconds), raises an `OSError` if it doesn't exist
+- Stored for every sprite in the atlas index by `atlas.py`, so `Backend`
+  notices a sprite that was changed after the atlas was built, without
+  reading the file
+    """
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def file_hash(path):
+    """
+- Returns the SHA-1 hash (as hex digits) of the content of the file at `path`
+- Stored for every sprite in the atlas index by `atlas.py` too, for files
+  whose `file_stat()` changed without their content changing (like after
+  a `git checkout`)
+    """
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
 
 
 def resource_path(relative_path: Path):
@@ -23,6 +59,190 @@ def resource_path(relative_path: Path):
     return os.path.join(base_path, relative_path)
 
 
+def read_png(path):
+    """
+- Reads the PNG file at `path` without tkinter (only `zlib` and `struct`)
+  and returns `(width, height, pixels)`
+- `pixels` is a `bytearray` of RGBA values, 4 bytes per pixel, row by row
+- Supports non-interlaced 8 bit greyscale, RGB, palette, greyscale+alpha
+  and RGBA images, which covers every image in `assets/`. Anything else
+  raises a `ValueError`
+
+    :param path:
+    :return (width, height, pixels):
+    """
+
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a PNG file")
+
+    position = 8
+    compressed = bytearray()
+    palette = transparency = b""
+    while position < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position+8])
+        chunk = data[position+8:position+8+length]
+        position += 12 + length
+
+        if chunk_type == b"IHDR":
+            width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"tRNS":
+            transparency = chunk
+        elif chunk_type == b"IDAT":
+            compressed += chunk
+        elif chunk_type == b"IEND":
+            break
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    if bit_depth != 8 or interlace or channels is None:
+        raise ValueError(f"{path}: only non-interlaced 8 bit PNG files are supported")
+
+    raw = zlib.decompress(compressed)
+    stride = width * channels
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type = raw[start]
+        row = bytearray(raw[start+1:start+1+stride])
+
+        if filter_type == 1:  # sub
+            for i in range(channels, stride):
+                row[i] = (row[i] + row[i-channels]) & 255
+        elif filter_type == 2:  # up
+            row = bytearray((a + b) & 255 for a, b in zip(row, previous))
+        elif filter_type == 3:  # average
+            for i in range(stride):
+                left = row[i-channels] if i >= channels else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 255
+        elif filter_type == 4:  # paeth
+            for i in range(stride):
+                a = row[i-channels] if i >= channels else 0
+                b = previous[i]
+                c = previous[i-channels] if i >= channels else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    predictor = a
+                elif pb <= pc:
+                    predictor = b
+                else:
+                    predictor = c
+                row[i] = (row[i] + predictor) & 255
+
+        rows.append(row)
+        previous = row
+
+    if color_type == 6:
+        return width, height, bytearray().join(rows)
+
+    pixels = bytearray()
+    for row in rows:
+        for x in range(width):
+            if color_type == 0:
+                grey = row[x]
+                pixels += bytes((grey, grey, grey, 255))
+            elif color_type == 2:
+                pixels += row[x*3:x*3+3] + b"\xff"
+            elif color_type == 3:
+                index = row[x]
+                alpha = transparency[index] if index < len(transparency) else 255
+                pixels += palette[index*3:index*3+3] + bytes((alpha,))
+            else:
+                grey, alpha = row[x*2], row[x*2+1]
+                pixels += bytes((grey, grey, grey, alpha))
+    return width, height, pixels
+
+
+def write_png(path, width, height, pixels, compression=9):
+    """
+- Writes RGBA `pixels` (4 bytes per pixel, row by row, like the ones
+  returned by `read_png()`) into a PNG file at `path`
+- The rows are stored unfiltered, so `read_png()` can read the file back
+  without having to undo any filter
+- `compression`: the zlib level (0 to 9), lower levels write much faster
+  but make bigger files
+
+    :param path:
+    :param width:
+    :param height:
+    :param pixels:
+    :param compression:
+    """
+
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    stride = width * 4
+    raw = bytearray((stride + 1) * height)  # the filter byte of every row stays 0
+    view = memoryview(pixels)
+    for y in range(height):
+        raw[y*(stride+1) + 1:(y+1)*(stride+1)] = view[y*stride:(y+1)*stride]
+
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(raw, compression)))
+        file.write(chunk(b"IEND", b""))
+
+
+def crop_pixels(image, region):
+    """
+- Returns the `(width, height, pixels)` of the rectangle `region` (`[x, y, width, height]`)
+  of `image`, a `(width, height, pixels)` tuple like the ones returned by `read_png()`
+    """
+    image_width, _, image_pixels = image
+    x, y, width, height = region
+    pixels = bytearray()
+    for row in range(y, y + height):
+        start = (row * image_width + x) * 4
+        pixels += image_pixels[start:start + width*4]
+    return width, height, pixels
+
+
+def crop_mask(atlas, region):
+    """
+- Returns the `collision.Bitmask` of the rectangle `region` (`[x, y, width, height]`)
+  of `atlas`, the `(width, height, pixels)` of the atlas image returned by `read_png()`
+    """
+    return collision.Bitmask.from_rgba(*crop_pixels(atlas, region))
+
+
+def write_file_atomically(path, data):
+    """
+- Writes the bytes `data` into the file at `path` so that the file always
+  holds either its old or its new content, even if the game crashes or the
+  computer turns off in the middle of the write
+- The data is written into a temporary file next to `path`, flushed to the
+  disk with `os.fsync()` and then renamed to `path` with `os.replace()`,
+  which replaces the old file in one step
+- On systems that support it, the directory is synced too, so the rename
+  itself is on the disk
+
+    :param path:
+    :param data:
+    """
+
+    path = Path(path)
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+    if hasattr(os, "O_DIRECTORY"):  # not available on Windows
+        directory = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
 class Backend:
     """
     This class handles the behind-the-scenes functioning of the game
@@ -47,6 +267,12 @@ class Backend:
     HELP = resource_path(assets_directory / "help.png")
     LOGO = resource_path(assets_directory / "logo.png")
 
+    ATLAS_IMAGE = resource_path(assets_directory / "atlas.png")
+    ATLAS_INDEX = resource_path(assets_directory / "atlas.json")
+    # all the images above packed into one image by `atlas.py`
+
+    ASSET_CACHE_LIMIT = 64 * 1024 * 1024  # bytes of decoded assets kept in `self.asset_cache`
+
     def __init__(self):
         self.game_background_image = self.DEFAULT_BACKGROUND
         self.game_player_image = self.DEFAULT_BIRD
@@ -58,17 +284,40 @@ class Backend:
         self.game_help_image = self.HELP
         self.game_logo_image = self.LOGO
 
+        self.asset_cache = OrderedDict()
+        self.asset_cache_size = 0
+        # decoded images and masks, so every file is only decoded once
+        self.atlas = AtlasReader(self.ATLAS_IMAGE, self.ATLAS_INDEX, resource_path(self.assets_directory))
+
+        self.loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="AssetLoader")
+        self.prefetched_files = {}  # path: future of the file's bytes
+        self.prefetched_masks = {}  # path: future of a dict with its mask
+        # filled by `self.prefetch_assets()`, used up by `self.load_image()` and `self.load_mask()`
+
         self.user_has_windows = True if "win" in platform.system().lower() else False
 
         self.classic_game_mode = False
         # in case the game directory can't be accessed, the game will not allow customisations
 
+        self.writer = BackgroundWriter()
+        # every read and write of the user data directory is a job of this thread,
+        # nothing in here waits for the disk on the tkinter thread
         self.init_game_directory()
 
         self.current_highscore_in_file = "0"
         self.highscore_file = self.settings_directory / "highscore.txt"
-        self.create_highscore_file_if_not_exists()
-        self.get_highscore_from_file()
+        self.highscore_needs_saving = False
+        # a beaten highscore is only written into the file by `self.save_highscore()`
+        self.highscore_loaded = False
+        self.highscore_listeners = []
+        # functions called on the tkinter thread once the highscore was read from its file
+        self.writer.submit(self.get_highscore_from_file, self.set_loaded_highscore)
+        atexit.register(self.close)  # in case the game is closed without `App.exit_game()`
+
+        self.profile = leaderboard.DEFAULT_PROFILE
+        self.leaderboard_file = self.settings_directory / "leaderboard.sqlite3"
+        self.leaderboard = None
+        # opened by the writer thread the first time it is needed, by `self.get_leaderboard()`
 
     def init_game_directory(self):
         """
@@ -78,16 +327,26 @@ This class variable contains the path to the game's user data directory
     - For Windows, the class attribute `self.root_directory_for_windows` is used
     - For any other OS, `self.root_directory` is used as the root directory
 
-- Makes all the parent and subdirectories by using
-  `Path.mkdir(parents=True, exist_ok=True)`, in case they don't exist
+- The directories are made (`self.check_game_directory()`) by the writer
+  thread, before anything is read from or written into them
+        """
+        self.settings_directory = self.get_settings_directory()
+        self.writer.submit(self.check_game_directory)
+
+    @classmethod
+    def get_settings_directory(cls):
+        """
+- Returns the path of the game's user data directory, the same one
+  `self.settings_directory` is set to, without making a `Backend`
+- Nothing is made, read or written, so tools can find files in the
+  directory without touching the player's data
         """
-        if self.user_has_windows:
-            current_root_directory = self.root_directory_for_windows
+        if "win" in platform.system().lower():
+            current_root_directory = cls.root_directory_for_windows
         else:
-            current_root_directory = self.root_directory
+            current_root_directory = cls.root_directory
 
-        self.settings_directory = current_root_directory / self.creator_root_directory / self.game_directory
-        self.check_game_directory()
+        return current_root_directory / cls.creator_root_directory / cls.game_directory
 
     def check_game_directory(self):
         """
@@ -99,7 +358,8 @@ In case of some error, `self.classic_game_mode` is set to `True`
     - this does not have a purpose yet
         """
         try:
-            self.settings_directory.mkdir(parents=True, exist_ok=True)
+            with performance.startup.phase("check game directory"):
+                self.settings_directory.mkdir(parents=True, exist_ok=True)
         except Exception as e:
             self.classic_game_mode = True
 
@@ -137,41 +397,184 @@ Calls `self.create_highscore_file_if_not_exists()`
       - these string values will be displayed to the user in the GUI later on >:)
       - else, `self.current_highscore_in_file` is set to the integer itself which
         was the high score of the player last time they played Blappy Fird
+      - runs on the writer thread, so the highscore is returned and then stored
+        by `self.set_loaded_highscore()` on the tkinter thread
         """
-        self.create_highscore_file_if_not_exists()
-        with open(self.highscore_file, "r") as file:
-            content = file.read().strip()
+        with performance.startup.phase("read highscore"):
+            self.create_highscore_file_if_not_exists()
+            with open(self.highscore_file, "r") as file:
+                content = file.read().strip()
             if not content.isdecimal():
-                with open(self.highscore_file, "w") as file:
-                    file.write("0")
+                write_file_atomically(self.highscore_file, b"0")
+                return "0"
 
             else:
                 if int(content) >= 5000:
-                    self.current_highscore_in_file = "CHEATER"
+                    return "CHEATER"
                 else:
-                    self.current_highscore_in_file = content
+                    return content
+
+    def set_loaded_highscore(self, highscore):
+        """
+- Called on the tkinter thread with the highscore read by `self.get_highscore_from_file()`
+- Stores it in `self.current_highscore_in_file` and calls every function in
+  `self.highscore_listeners`, so `App` can show it
+        """
+        self.current_highscore_in_file = highscore
+        self.highscore_loaded = True
+        for listener in self.highscore_listeners:
+            listener()
 
     def update_highscore_in_file(self, score: int):
         """
 - If `self.current_highscore_in_file` is set to the God or Cheater string values, stop the function here
 - If the given argument `score` is less than or equal to the integer value of `self.current_highscore_in_file`, that means the player hasn't beaten the current highscore. the function stops here
-- Otherwise, the `self.check_game_directory()` is called and the `score` is written into the file, implying the player beat their highscore
-- `self.current_highscore_in_file` is set to the string form of `score`
+- Otherwise the player beat their highscore: `self.current_highscore_in_file` is set to the string form of `score`
+- The file isn't written here, `self.highscore_needs_saving` is set to `True` and
+  `self.save_highscore()` writes the highest score once when the game is closed,
+  so a game over never waits for the disk
+- Returns `True` if the highscore was beaten, `False` otherwise
 
 
         :param score:
         """
+        if not self.highscore_loaded:
+            self.writer.flush()  # the highscore has to be known before it is compared
+
         if self.current_highscore_in_file in ("GOD???", "CHEATER"):
-            return
+            return False
 
         if score <= int(self.current_highscore_in_file):
+            return False
+
+        self.current_highscore_in_file = str(score)
+        self.highscore_needs_saving = True
+        return True
+
+    def save_highscore(self):
+        """
+- Writes `self.current_highscore_in_file` into `self.highscore_file` with
+  `write_file_atomically()` on the writer thread, if it was beaten since it
+  was last written
+- Called by `self.close()`
+        """
+        if not self.highscore_needs_saving:
             return
 
-        self.check_game_directory()
-        with open(self.highscore_file, "w") as file:
-            file.write(str(score))
+        highscore = self.current_highscore_in_file
+        self.highscore_needs_saving = False
 
-        self.current_highscore_in_file = str(score)
+        def save():
+            self.check_game_directory()
+            try:
+                write_file_atomically(self.highscore_file, highscore.encode())
+            except OSError:
+                print("highscore couldn't be saved")
+
+        self.writer.submit(save)
+
+    def close(self):
+        """
+- Saves the highscore and waits until the writer thread has written
+  everything, called by `App.exit_game()`
+- Also called when Python exits, in case the window was closed some other way
+        """
+        self.save_highscore()
+        self.writer.wait()
+
+    def save_replay(self, data: bytes, name: str):
+        """
+- Writes the replay file `data` (made by `replay.Recorder`) into the
+  `replays` folder inside `self.settings_directory`, with the file name `name`,
+  on the writer thread
+- Nothing is saved if the game's user data directory can't be accessed
+  (`self.classic_game_mode` is `True`)
+
+        :param data:
+        :param name:
+        """
+
+        def save():
+            self.check_game_directory()
+            if self.classic_game_mode:
+                return
+
+            replays_directory = self.settings_directory / "replays"
+            try:
+                replays_directory.mkdir(exist_ok=True)
+                with open(replays_directory / name, "wb") as file:
+                    file.write(data)
+            except OSError:
+                print("replay couldn't be saved")
+
+        self.writer.submit(save)
+
+    def get_leaderboard(self):
+        """
+- Returns the `leaderboard.Leaderboard` stored in `self.leaderboard_file`,
+  which is only opened the first time
+- Returns `None` if the game's user data directory can't be accessed or
+  the database can't be opened
+- Only to be used by jobs of the writer thread, a SQLite connection can
+  only be used by the thread that opened it
+        """
+        if self.leaderboard is None and not self.classic_game_mode:
+            try:
+                self.leaderboard = leaderboard.Leaderboard(self.leaderboard_file)
+            except sqlite3.Error:
+                print("leaderboard couldn't be opened")
+        return self.leaderboard
+
+    def add_round_to_leaderboard(self, score: int, seed: int, duration_ms: int, replay_data: bytes):
+        """
+- Stores a finished round of `self.profile` in the leaderboard, together
+  with its replay file `replay_data`, on the writer thread
+
+        :param score:
+        :param seed:
+        :param duration_ms:
+        :param replay_data:
+        """
+        profile = self.profile
+
+        def add():
+            board = self.get_leaderboard()
+            if board is None:
+                return
+
+            try:
+                board.add_round(score, seed, duration_ms, replay_data, profile=profile)
+            except sqlite3.Error:
+                print("round couldn't be added to the leaderboard")
+
+        self.writer.submit(add)
+
+    def query_leaderboard(self, query, on_done):
+        """
+- Runs `query(leaderboard)` on the writer thread, after every round that
+  was added before, and then calls `on_done(result)` on the tkinter thread
+- `on_done` isn't called if there's no leaderboard or the query failed
+
+        :param query:
+        :param on_done:
+        """
+
+        def run_query():
+            board = self.get_leaderboard()
+            if board is None:
+                return None
+
+            try:
+                return query(board)
+            except sqlite3.Error:
+                print("leaderboard couldn't be read")
+                return None
+
+        def deliver(result):
+            if result is not None:
+                on_done(result)
+
+        self.writer.submit(run_query, deliver)
 
     def get_current_highscore(self):
         """
@@ -180,6 +583,200 @@ Calls `self.create_highscore_file_if_not_exists()`
         """
         return self.current_highscore_in_file
 
+    def get_cached_asset(self, key, load):
+        """
+- Returns the asset stored with `key` in `self.asset_cache`
+- If it isn't stored yet, `load()` is called to decode it and the returned
+  `(asset, size_in_bytes)` is stored, so the next call with the same key
+  returns the very same object without reading the file again
+- The cache works as an LRU cache: whenever the total size goes over
+  `self.ASSET_CACHE_LIMIT`, the least recently used assets are removed
+        """
+        if key in self.asset_cache:
+            self.asset_cache.move_to_end(key)
+            return self.asset_cache[key][0]
+
+        with performance.startup.phase(" ".join([f"decode {key[0]}"] + [os.path.basename(str(part)) for part in key[1:]])):
+            asset, size = load()
+        self.asset_cache[key] = (asset, size)
+        self.asset_cache_size += size
+
+        while self.asset_cache_size > self.ASSET_CACHE_LIMIT and len(self.asset_cache) > 1:
+            _, (_, evicted_size) = self.asset_cache.popitem(last=False)
+            self.asset_cache_size -= evicted_size
+
+        return asset
+
+    def invalidate_asset_cache(self, path=None):
+        """
+- Removes the image and mask of the file at `path` from `self.asset_cache`,
+  so they are decoded again the next time they are requested
+  (for example after the file was changed)
+- If `path` is `None`, the whole cache is cleared
+        """
+        for key in list(self.asset_cache):
+            if path is None or key[1] == str(path):
+                _, size = self.asset_cache.pop(key)
+                self.asset_cache_size -= size
+
+    def get_atlas_region(self, path):
+        """
+- Returns the rectangle `[x, y, width, height]` of the image file at `path`
+  inside the atlas image `self.ATLAS_IMAGE`, or `None` if it isn't in the atlas
+- See `AtlasReader.get_region()`
+        """
+        return self.atlas.get_region(path)
+
+    def prefetch_assets(self):
+        """
+- Starts the parts of loading the current assets that don't need tkinter
+  on the threads of `self.loader`, so they are done while the window is
+  being made:
+    - reading the bytes of the atlas image (and of the current images
+      that aren't in the atlas), `self.prefetched_files`
+    - decoding the collision masks of the current bird and pillars with
+      `read_png()`, `self.prefetched_masks`
+- `self.load_image()` and `self.load_mask()` use these results (waiting
+  for them if needed) instead of reading the files again
+        """
+        paths = [
+            self.game_background_image, self.game_player_image,
+            self.game_pillar_up_image, self.game_pillar_down_image,
+            self.game_play_button_image, self.game_exit_button_image,
+            self.game_help_image, self.game_logo_image
+        ]
+        files = {str(self.ATLAS_IMAGE)}
+        files.update(str(path) for path in paths if self.get_atlas_region(path) is None)
+        def read(path):
+            with performance.startup.phase("read " + os.path.basename(path)):
+                return Path(path).read_bytes()
+
+        for path in files:
+            self.prefetched_files[path] = self.loader.submit(read, path)
+
+        regions = {
+            str(path): self.get_atlas_region(path)
+            for path in (self.game_player_image, self.game_pillar_up_image, self.game_pillar_down_image)
+        }  # found here, `self.atlas` must only be used by this thread
+        masks = self.loader.submit(self.make_masks, regions)
+        for path in regions:
+            self.prefetched_masks[path] = masks
+
+    def make_masks(self, regions):
+        """
+- Returns a dict of path: `collision.Bitmask` for `regions`, a dict of
+  path: its rectangle in the atlas (or `None`, see `self.get_atlas_region()`)
+- The atlas image is decoded at most once for all of them
+- Runs on a thread of `self.loader`, so it doesn't use `self.asset_cache`
+        """
+        masks = {}
+        atlas = None
+        with performance.startup.phase("decode masks " + " ".join(os.path.basename(path) for path in regions)):
+            for path, region in regions.items():
+                if region is None:
+                    masks[path] = collision.Bitmask.from_rgba(*read_png(path))
+                    continue
+
+                if atlas is None:
+                    atlas = read_png(self.ATLAS_IMAGE)
+                masks[path] = crop_mask(atlas, region)
+        return masks
+
+    def read_image_file(self, path):
+        """
+- Returns a new `PhotoImage` object of the image file at `path`
+- If the bytes of the file were prefetched by `self.prefetch_assets()`,
+  tkinter decodes them instead of reading the file again
+        """
+        future = self.prefetched_files.pop(str(path), None)
+        if future is not None:
+            try:
+                return PhotoImage(data=future.result())
+            except (OSError, TclError):
+                pass  # the file is read by tkinter itself below, which shows the actual error
+        return PhotoImage(file=path)
+
+    def load_image(self, path):
+        """
+- Returns the `PhotoImage` object of the image file at `path`
+- If the image is in the atlas, it is copied out of the atlas image
+  (which is decoded only once for all the images) instead of reading its file
+- The image is only decoded the first time, every other call returns
+  the same `PhotoImage` object from `self.asset_cache`
+        """
+        def load():
+            region = self.get_atlas_region(path)
+            if region is None:
+                image = self.read_image_file(path)
+            else:
+                x, y, width, height = region
+                atlas = self.get_cached_asset(("image", self.ATLAS_IMAGE), load_atlas)
+                image = PhotoImage(width=width, height=height)
+                image.tk.call(image, "copy", atlas, "-from", x, y, x + width, y + height)
+            return image, image.width() * image.height() * 4
+
+        def load_atlas():
+            atlas = self.read_image_file(self.ATLAS_IMAGE)
+            return atlas, atlas.width() * atlas.height() * 4
+
+        return self.get_cached_asset(("image", str(path)), load)
+
+    def load_mask(self, path):
+        """
+- Returns the `collision.Bitmask` of the image file at `path`
+- Just like `self.load_image()`, the pixels come from the atlas if the
+  image is in it, and the mask is only made once per file
+- A mask made by `self.prefetch_assets()` is used if there is one
+        """
+        def load():
+            future = self.prefetched_masks.pop(str(path), None)
+            region = self.get_atlas_region(path)
+            if future is not None:
+                mask = future.result()[str(path)]
+            elif region is None:
+                mask = collision.Bitmask.from_rgba(*read_png(path))
+            else:
+                mask = crop_mask(self.load_pixels(self.ATLAS_IMAGE), region)
+            return mask, mask.width * mask.height // 8
+
+        return self.get_cached_asset(("mask", str(path)), load)
+
+    def load_pixels(self, path):
+        """
+- Returns the `(width, height, pixels)` of the image file at `path`, like
+  `read_png()`, for making masks without tkinter
+- Just like `self.load_image()`, the pixels come from the atlas if the
+  image is in it, and they are only decoded once per file
+        """
+        def load():
+            region = self.get_atlas_region(path)
+            if region is None:
+                image = read_png(path)
+            else:
+                image = crop_pixels(self.load_pixels(self.ATLAS_IMAGE), region)
+            return image, len(image[2])
+
+        return self.get_cached_asset(("pixels", str(path)), load)
+
+    def scale_image(self, image, zoom, subsample):
+        """
+- Returns the `PhotoImage` object `image` scaled by `zoom / subsample`,
+  made with `PhotoImage.zoom()` and `PhotoImage.subsample()` (which keep
+  the pixels sharp)
+- Every scaled image is made only once and kept in `self.asset_cache`,
+  so going back to a scale used before costs nothing
+        """
+        if zoom == subsample == 1:
+            return image
+
+        def load():
+            scaled_image = image.zoom(zoom) if zoom > 1 else image
+            if subsample > 1:
+                scaled_image = scaled_image.subsample(subsample)
+            return scaled_image, scaled_image.width() * scaled_image.height() * 4
+
+        return self.get_cached_asset(("scaled", str(image), zoom, subsample), load)
+
     def get_current_bg_image(self):
         """
 - returns the `PhotoImage` object of `self.game_background_image`
@@ -189,10 +786,10 @@ Calls `self.create_highscore_file_if_not_exists()`
   so they can be drawn on the canvas in the GUI.
         """
         try:
-            return PhotoImage(file=self.game_background_image)
+            return self.load_image(self.game_background_image)
         except Exception:
             print("bg image doesn't exist")
-            return PhotoImage(file=self.DEFAULT_BACKGROUND)
+            return self.load_image(self.DEFAULT_BACKGROUND)
 
     def get_current_player_image(self):
         """
@@ -200,10 +797,10 @@ Calls `self.create_highscore_file_if_not_exists()`
 - in case of an error, returns the `PhotoImage` object of `self.DEFAULT_BIRD`
         """
         try:
-            return PhotoImage(file=self.game_player_image)
+            return self.load_image(self.game_player_image)
         except Exception:
             print("player image doesn't exist")
-            return PhotoImage(file=self.DEFAULT_BIRD)
+            return self.load_image(self.DEFAULT_BIRD)
 
     def get_current_pillar_images(self) -> list[PhotoImage]:
         """
@@ -211,13 +808,13 @@ Calls `self.create_highscore_file_if_not_exists()`
 - in case of an error, returns the `PhotoImage` objects of `self.DEFAULT_PILLAR_UP` and `self.DEFAULT_PILLAR_DOWN`
         """
         try:
-            img1 = PhotoImage(file=self.game_pillar_up_image)
-            img2 = PhotoImage(file=self.game_pillar_down_image)
+            img1 = self.load_image(self.game_pillar_up_image)
+            img2 = self.load_image(self.game_pillar_down_image)
             return [img1, img2]
         except Exception:
             print("buttons images don't exist")
-            img1 = PhotoImage(file=self.DEFAULT_PILLAR_UP)
-            img2 = PhotoImage(file=self.DEFAULT_PILLAR_DOWN)
+            img1 = self.load_image(self.DEFAULT_PILLAR_UP)
+            img2 = self.load_image(self.DEFAULT_PILLAR_DOWN)
             return [img1, img2]
 
     def get_buttons_images(self) -> tuple[PhotoImage, PhotoImage]:
@@ -226,12 +823,12 @@ Calls `self.create_highscore_file_if_not_exists()`
 - in case of an error, returns  the `PhotoImage` objects of `self.PLAY_BUTTON` and `self.EXIT_BUTTON`
         """
         try:
-            img1 = PhotoImage(file=self.game_play_button_image)
-            img2 = PhotoImage(file=self.game_exit_button_image)
+            img1 = self.load_image(self.game_play_button_image)
+            img2 = self.load_image(self.game_exit_button_image)
         except Exception:
             print("buttons images don't exist")
-            img1 = PhotoImage(file=self.PLAY_BUTTON)
-            img2 = PhotoImage(file=self.EXIT_BUTTON)
+            img1 = self.load_image(self.PLAY_BUTTON)
+            img2 = self.load_image(self.EXIT_BUTTON)
         return img1, img2
 
     def get_logo_image(self):
@@ -240,9 +837,9 @@ Calls `self.create_highscore_file_if_not_exists()`
 - in case of an error, returns the `PhotoImage` object of `self.LOGO`
         """
         try:
-            return PhotoImage(file=self.game_logo_image)
+            return self.load_image(self.game_logo_image)
         except:
-            return PhotoImage(file=self.LOGO)
+            return self.load_image(self.LOGO)
 
     def get_help_image(self):
         """
@@ -250,6 +847,119 @@ Calls `self.create_highscore_file_if_not_exists()`
 - in case of an error, returns the `PhotoImage` object of `self.HELP`
         """
         try:
-            return PhotoImage(file=self.game_help_image)
+            return self.load_image(self.game_help_image)
         except:
-            return PhotoImage(file=self.HELP)
+            return self.load_image(self.HELP)
+
+    def get_mask(self, image_path, default_path):
+        """
+- returns a `collision.Bitmask` of the opaque pixels of the image at `image_path`
+- in case of an error, returns the `collision.Bitmask` of `default_path`
+- returns `None` if even that image can't be read, in which case the
+  game falls back to the rectangle hitboxes in `collision.BIRD_HITBOXES`
+        """
+        for path in (image_path, default_path):
+            try:
+                return self.load_mask(path)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def get_current_player_mask(self):
+        """
+- returns the `collision.Bitmask` of `self.game_player_image`
+- this is made from the image itself, so custom birds get their own
+  exact hitbox instead of the default bird's rectangles
+        """
+        return self.get_mask(self.game_player_image, self.DEFAULT_BIRD)
+
+    def get_current_pillar_masks(self):
+        """
+- returns the `collision.Bitmask` objects of `self.game_pillar_up_image` and
+  `self.game_pillar_down_image` as a tuple
+        """
+        return (
+            self.get_mask(self.game_pillar_up_image, self.DEFAULT_PILLAR_UP),
+            self.get_mask(self.game_pillar_down_image, self.DEFAULT_PILLAR_DOWN)
+        )
+
+
+class AtlasReader:
+    """
+    This class finds the asset images in the atlas made by `atlas.py` and
+    reads their pixels with `read_png()`, without tkinter.
+
+    Unlike `Backend`, it doesn't touch the user data directory and starts
+    no threads, so tools that only draw the assets (`headless.py` and the
+    golden image tests) use one of their own. `Backend` keeps one in
+    `Backend.atlas` for finding the images in the atlas.
+    """
+
+    def __init__(self, atlas_image=Backend.ATLAS_IMAGE, atlas_index=Backend.ATLAS_INDEX,
+                 assets_path=resource_path(Backend.assets_directory)):
+        """
+- `atlas_image`, `atlas_index`: the files made by `atlas.py`
+- `assets_path`: the directory the names in the index are relative to
+        """
+        self.atlas_image = atlas_image
+        self.atlas_index = atlas_index
+        self.assets_path = assets_path
+
+        self.index = None  # read by `self.get_region()` the first time it is needed
+        self.fresh = {}  # sprite name: whether its file still matches the atlas
+        self.pixels = {}  # path: the `(width, height, pixels)` of the file, see `self.load_pixels()`
+
+    def get_region(self, path):
+        """
+- Returns the rectangle `[x, y, width, height]` of the image file at `path`
+  inside the atlas image `self.atlas_image`, or `None` if it isn't in the atlas
+- The index `self.atlas_index` is only read once and stored in `self.index`.
+  If it doesn't exist, nothing is in the atlas
+- An image is also ignored if its own file exists and was changed after
+  the atlas was built, so changed assets show up even if `atlas.py` wasn't
+  run again (in the EXE file only the atlas is bundled):
+    - a file whose size and modification time (`file_stat()`) are the ones
+      stored in the index is taken as unchanged, without reading it
+    - otherwise its content is hashed and compared with the hash stored in
+      the index (`file_hash()`), so a file that was only touched still counts
+    - every file is only checked once, the result is kept in `self.fresh`
+        """
+        if self.index is None:
+            try:
+                with open(self.atlas_index, "r") as file:
+                    self.index = json.load(file)
+                self.index["sprites"]
+            except (OSError, ValueError, KeyError):
+                self.index = {"sprites": {}}
+
+        name = Path(os.path.relpath(path, self.assets_path)).as_posix()
+        region = self.index["sprites"].get(name)
+
+        if region is None:
+            return None
+        if name not in self.fresh:
+            try:
+                stat = file_stat(path)
+            except OSError:
+                stat = None  # only the atlas exists
+            self.fresh[name] = (
+                stat is None
+                or stat == self.index.get("file_stats", {}).get(name)
+                or file_hash(path) == self.index.get("file_hashes", {}).get(name)
+            )
+        return region if self.fresh[name] else None
+
+    def load_pixels(self, path):
+        """
+- Returns the `(width, height, pixels)` of the image file at `path`, like
+  `read_png()`, cut out of the atlas image if the image is in it
+- Every file (and the atlas image) is only decoded once, the result is
+  kept in `self.pixels`
+        """
+        if str(path) not in self.pixels:
+            region = self.get_region(path)
+            if region is None:
+                self.pixels[str(path)] = read_png(path)
+            else:
+                self.pixels[str(path)] = crop_pixels(self.load_pixels(self.atlas_image), region)
+        return self.pixels[str(path)]
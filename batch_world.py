@@ -0,0 +1,191 @@
+import numpy as np
+
+import collision
+from world import World
+
+
+class BatchWorld:
+    """
+    This class simulates `n` independent rounds of Blappy Fird at once.
+
+    Instead of one `World` object per round, the state of every round is
+    stored in NumPy arrays (one element per round) and all the rounds are
+    stepped together by `step()`, using the same constants and rules as
+    `world.World`. This is used for bots and balancing runs which need
+    thousands of rounds, where stepping `World` objects one by one is too slow.
+
+    `numpy` is only needed for this file, the game itself doesn't use it.
+    """
+
+    def __init__(self, n, width=600, height=500, bird_size=(56, 43), pillar_size=(100, 400), seed=None):
+        """
+- `n` is the amount of rounds simulated together
+- `width`, `height`, `bird_size` and `pillar_size` are the same as in `World`
+- `seed` seeds `self.rng`, the random generator used for the pillars' heights
+
+The constants (gravity, terminal velocity, hop velocity, pillar gap,
+pillar distance, etc) are copied from a `World` made with the same
+arguments, so both simulations always use the same values. A step is
+always one step of `World` with its default `substeps` of 1
+        """
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+
+        template = World(width, height, bird_size, pillar_size)
+        self.bird_width, self.bird_height = template.bird_width, template.bird_height
+        self.pillar_width, self.pillar_height = template.pillar_width, template.pillar_height
+        self.bird_spawnpoint = template.bird_spawnpoint
+        self.terminal_velocity = template.terminal_velocity
+        self.gravity_acceleration = template.gravity_acceleration
+        self.hop_velocity = template.hop_velocity
+        self.bottom_death_limit = template.bottom_death_limit
+        self.bird_hitboxes = template.bird_hitboxes
+
+        self.pillar_spawnpoint_x = template.pillar_spawnpoint_x
+        self.pillar_distance = template.pillar_distance
+        self.pillar_hole_gap = template.pillar_hole_gap
+        self.pillar_speed = template.pillar_speed
+        self.pillar_count = len(template.initial_pillar_positions)
+        self.GAP_TOP_Y = template.STANDARD_PILLAR_UP_Y + template.pillar_height
+        # y coordinate of the top of the hole, before the random shift is added
+
+        self.bird_x = template.bird_x
+        self.bird_y = np.zeros(n)
+        self.bird_velocity = np.zeros(n)
+        self.pillar_x = np.zeros((n, self.pillar_count))
+        self.pillar_shift = np.zeros((n, self.pillar_count))
+        self.currently_tracking_index = np.zeros(n, dtype=np.int64)
+        self.current_score = np.zeros(n, dtype=np.int64)
+        self.alive = np.ones(n, dtype=bool)
+        self.frame = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def random_shifts(self, shape):
+        """
+Returns an array of random values from -100 to 100 in the factor of 10,
+just like the `random_shift` of the pillars in `World`
+        """
+        return self.rng.integers(-10, 11, size=shape) * 10
+
+    def reset(self, mask=None):
+        """
+Resets the bird, the pillars and the score of the rounds selected by
+the boolean array `mask` (all of them if `mask` is `None`)
+        """
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+
+        count = int(mask.sum())
+        self.bird_y[mask] = self.bird_spawnpoint[1]
+        self.bird_velocity[mask] = 0
+        self.pillar_x[mask] = self.pillar_spawnpoint_x + self.pillar_distance * np.arange(self.pillar_count)
+        self.pillar_shift[mask] = self.random_shifts((count, self.pillar_count))
+        self.currently_tracking_index[mask] = 0
+        self.current_score[mask] = 0
+        self.alive[mask] = True
+        self.frame[mask] = 0
+
+    def shift_unseen_pillars(self, alive):
+        """
+For every alive round whose last pillar is `self.pillar_distance` pixels
+away from `self.pillar_spawnpoint_x`, the first (leftmost) pillar is shifted
+right behind the last one and gets a new random height
+        """
+        rows = np.arange(self.n)
+        last = self.pillar_x.argmax(axis=1)
+        last_x = self.pillar_x[rows, last]
+        shifting = alive & (self.pillar_spawnpoint_x - last_x >= self.pillar_distance)
+        if not shifting.any():
+            return
+
+        rows = rows[shifting]
+        first = self.pillar_x[rows].argmin(axis=1)
+        self.pillar_x[rows, first] = last_x[shifting] + self.pillar_distance
+        self.pillar_shift[rows, first] = self.random_shifts(len(rows))
+
+    def bird_collides_with_pillars(self):
+        """
+Returns a boolean array, `True` for every round in which one of the
+bird's rectangles (`self.bird_hitboxes`, the same ones as in `World`)
+touches a pillar
+
+The same test as `collision.rectangle_hits_pillar()`, done for the x
+interval and the hole interval of every pillar at once, as
+`(n, pillar_count)` arrays
+        """
+        pillar_left = self.pillar_x
+        pillar_right = self.pillar_x + self.pillar_width
+        gap_top = self.GAP_TOP_Y + self.pillar_shift
+        gap_bottom = gap_top + self.pillar_hole_gap
+
+        hit = np.zeros(self.n, dtype=bool)
+        for x1, y1, x2, y2 in collision.bird_hitboxes(self.bird_x, self.bird_y[:, None], self.bird_hitboxes):
+            inside_x = (x2 >= pillar_left) & (x1 <= pillar_right)
+            outside_gap = (y1 <= gap_top) | (y2 >= gap_bottom)
+            hit |= (inside_x & outside_gap).any(axis=1)
+        return hit
+
+    def check_pillar_for_score(self, alive):
+        """
+Increases the score of every alive round whose bird crossed the pillar
+it is tracking, and returns a boolean array of the rounds in which the
+bird crossed it while flying above the window (which kills the bird)
+        """
+        rows = np.arange(self.n)
+        tracked_x = self.pillar_x[rows, self.currently_tracking_index]
+        crossed = alive & (tracked_x + self.pillar_width/2 < self.bird_x + self.bird_width/2)
+        above_window = crossed & (self.bird_y + self.bird_height/2 < 0)
+
+        scored = crossed & ~above_window
+        self.current_score += scored
+        self.currently_tracking_index[scored] = (self.currently_tracking_index[scored] + 1) % self.pillar_count
+        return above_window
+
+    def observe(self):
+        """
+Returns the observations of every round as an `(n, 4)` array, the same
+4 values as `environment.BlappyFirdEnv.observe()` for a single `World`:
+the y coordinate of the bird's center, its velocity, the horizontal
+distance to the center of the tracked pillar and the vertical offset to
+the center of its hole
+        """
+        rows = np.arange(self.n)
+        bird_center_x = self.bird_x + self.bird_width/2
+        bird_center_y = self.bird_y + self.bird_height/2
+        tracked = self.currently_tracking_index
+        gap_center = self.GAP_TOP_Y + self.pillar_shift[rows, tracked] + self.pillar_hole_gap/2
+
+        return np.stack([
+            bird_center_y,
+            self.bird_velocity,
+            self.pillar_x[rows, tracked] + self.pillar_width/2 - bird_center_x,
+            gap_center - bird_center_y,
+        ], axis=1)
+
+    def step(self, hops=None):
+        """
+Simulates one step (`World.TICK_MS` milliseconds) of every alive round
+    - `hops` is an optional boolean array, `True` for the rounds in which
+      the bird should hop before gravity is applied
+    - rounds that already ended are left untouched until they are `reset()`
+
+Returns `self.alive`
+        """
+        alive = self.alive.copy()
+        if hops is not None:
+            self.bird_velocity[alive & hops] = self.hop_velocity
+
+        falling = np.minimum(self.bird_velocity + self.gravity_acceleration, self.terminal_velocity)
+        self.bird_velocity = np.where(alive, falling, self.bird_velocity)
+        self.bird_y = np.where(alive, self.bird_y + self.bird_velocity, self.bird_y)
+        self.pillar_x[alive] -= self.pillar_speed
+        self.shift_unseen_pillars(alive)
+
+        lost = self.check_pillar_for_score(alive)
+        lost |= self.bird_collides_with_pillars()
+        lost |= self.bird_y + self.bird_height/2 >= self.bottom_death_limit
+
+        self.alive &= ~lost
+        self.frame += alive
+        return self.alive
@@ -0,0 +1,369 @@
+"""
+Performance benchmarks of Blappy Fird.
+
+Run from the game's folder:
+
+    python benchmarks/run.py                    print the results
+    python benchmarks/run.py -o results.json    also write them into a file
+    python benchmarks/run.py --only collision headless_steps
+
+The results are written as JSON, together with the git commit they were
+measured at, so runs of different commits can be compared.
+
+The benchmarks that need tkinter (`frame_time`, `collision` for the old
+canvas method, `cold_start`) use a withdrawn window, which still needs a
+display. On a server without one, run them under a virtual framebuffer
+(`xvfb-run python benchmarks/run.py`), otherwise they are reported as skipped.
+
+The game is run with a temporary user data directory (see
+`use_temporary_user_data()`), so the rounds the benchmarks play are never
+saved into the player's highscore, replays or leaderboard.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+GAME_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIRECTORY)
+os.chdir(GAME_DIRECTORY)  # `backend.resource_path()` finds the assets from the current directory
+
+import backend
+import collision
+import leaderboard
+import replay
+from evaluate import simple_policy
+
+
+def time_calls(function, calls, repeat=3):
+    """
+Calls `function` `calls` times, `repeat` times over, and returns the
+best average time of one call, in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def percentile(values, fraction):
+    """
+Returns the value at `fraction` (0 to 1) of the sorted `values`
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def use_temporary_user_data(directory):
+    """
+Makes every `Backend` of this process use a user data directory inside
+`directory` (a temporary directory) instead of the player's, by changing
+the root directories `Backend.get_settings_directory()` starts from
+    """
+    backend.Backend.root_directory = Path(directory)
+    backend.Backend.root_directory_for_windows = Path(directory)
+
+
+def make_tk_root():
+    """
+Returns a withdrawn `tk.Tk` window, or raises `RuntimeError` if tkinter
+can't open one (no display)
+    """
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as error:
+        raise RuntimeError(f"tkinter can't open a window: {error}")
+    root.withdraw()
+    return root
+
+
+def bench_headless_steps(quick):
+    """
+Steps of `World` per second, with the rectangle hitboxes and with the
+pixel perfect masks, while `simple_policy()` plays
+    """
+    results = {}
+    steps = 20_000 if quick else 200_000
+
+    for name, world in (("rectangles", replay.make_world(False)), ("masks", replay.make_world(True))):
+        world.reset(0)
+        start = time.perf_counter()
+        for _ in range(steps):
+            if world.step(simple_policy(world)):
+                world.reset()
+        results[f"{name}_steps_per_second"] = steps / (time.perf_counter() - start)
+
+    return results
+
+
+def bench_batch_steps(quick):
+    """
+Rounds stepped per second by `BatchWorld` (needs numpy)
+    """
+    try:
+        import numpy as np
+        from batch_world import BatchWorld
+    except ImportError:
+        return {"skipped": "numpy is not installed"}
+
+    results = {}
+    steps = 200 if quick else 1000
+    for n in (1_000, 10_000, 100_000):
+        batch = BatchWorld(n, seed=0)
+        hops = np.zeros(n, dtype=bool)
+        start = time.perf_counter()
+        for step in range(steps):
+            hops[:] = step % 12 == 0
+            batch.step(hops)
+            batch.reset(~batch.alive)
+        results[f"n{n}_round_steps_per_second"] = n * steps / (time.perf_counter() - start)
+    return results
+
+
+def bench_collision(quick):
+    """
+Collision checks per second
+    - `find_overlapping`: the original method, 2 `find_overlapping` calls on a
+      canvas with the same items as the game and the `sum(tags) > 10` test
+    - `rectangles` and `masks`: the `collision` module
+    """
+    calls = 2_000 if quick else 20_000
+    world = replay.make_world(True)
+    world.reset(0)
+    for _ in range(40):
+        world.step(simple_policy(world))  # bring the first pillar close to the bird
+
+    gap_top_y = world.STANDARD_PILLAR_UP_Y + world.pillar_height
+    results = {
+        "rectangles_checks_per_second": 1 / time_calls(lambda: collision.bird_hits_pillars(
+            world.bird_x, world.bird_y, world.pillars, world.pillar_width, gap_top_y, world.pillar_hole_gap
+        ), calls),
+        "masks_checks_per_second": 1 / time_calls(lambda: collision.bird_mask_hits_pillars(
+            world.bird_x, world.bird_y, world.bird_mask, world.pillars, world.pillar_width,
+            world.STANDARD_PILLAR_UP_Y, world.STANDARD_PILLAR_DOWN_Y, world.pillar_masks
+        ), calls),
+    }
+
+    try:
+        root = make_tk_root()
+    except RuntimeError as error:
+        results["find_overlapping"] = {"skipped": str(error)}
+        return results
+
+    import tkinter as tk
+    from backend import Backend
+
+    canvas = tk.Canvas(root, width=600, height=500)
+    background = tk.PhotoImage(file=Backend.DEFAULT_BACKGROUND)
+    bird = tk.PhotoImage(file=Backend.DEFAULT_BIRD)
+    pillar_up = tk.PhotoImage(file=Backend.DEFAULT_PILLAR_UP)
+    pillar_down = tk.PhotoImage(file=Backend.DEFAULT_PILLAR_DOWN)
+
+    for i in range(3):
+        canvas.create_image(600 * i, 0, image=background, anchor=tk.NW)
+    bird_item = canvas.create_image(0, 0, image=bird)
+    canvas.moveto(bird_item, world.bird_x, world.bird_y)
+    for x, random_shift in world.initial_pillar_positions:
+        canvas.moveto(canvas.create_image(0, 0, image=pillar_up), x, world.STANDARD_PILLAR_UP_Y + random_shift)
+        canvas.moveto(canvas.create_image(0, 0, image=pillar_down), x, world.STANDARD_PILLAR_DOWN_Y + random_shift)
+
+    def find_overlapping_check():
+        x1, y1, x2, y2 = canvas.bbox(bird_item)
+        with_body = canvas.find_overlapping(x1+7, y1, x2-16, y2-1)
+        with_beak = canvas.find_overlapping(x1+7+32, y1+18, x2, y2-1)
+        return sum(set(with_body + with_beak)) > 10
+
+    results["find_overlapping_checks_per_second"] = 1 / time_calls(find_overlapping_check, calls)
+    root.destroy()
+    return results
+
+
+def bench_frame_time(quick):
+    """
+Milliseconds per frame of the game in a withdrawn window: one step of
+the game (`App.update_game()`), drawing it (`App.render()`) and letting
+tkinter redraw the canvas, while `simple_policy()` plays
+    """
+    try:
+        make_tk_root().destroy()
+    except RuntimeError as error:
+        return {"skipped": str(error)}
+
+    import main
+
+    app = main.App(run=False)
+    app.withdraw()
+    app.new_game()
+    app.start_game()
+
+    frame_times = []
+    for _ in range(500 if quick else 3000):
+        if not app.round_running:
+            app.new_game()
+            app.start_game()
+        if simple_policy(app.world):
+            app.make_bird_hop()
+
+        start = time.perf_counter()
+        app.update_game()
+        app.render()
+        app.update_idletasks()
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+    app.backend.close()  # written now, while the temporary user data directory still exists
+    app.destroy()
+    return {
+        "frames": len(frame_times),
+        "mean_ms": sum(frame_times) / len(frame_times),
+        "p50_ms": percentile(frame_times, 0.5),
+        "p99_ms": percentile(frame_times, 0.99),
+        "max_ms": max(frame_times),
+    }
+
+
+def cold_start_child():
+    """
+Runs in a new Python process: imports the game, makes the window and
+draws the first frame, then prints the milliseconds each part took as JSON
+    - `app_to_first_frame_ms`: until the window shows its background
+      (`App.first_frame_time`), the rest of the assets are decoded after it
+    - `app_to_ready_ms`: until everything of the main menu is drawn
+    """
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    app = main.App(run=False)
+    app.update()
+    drawn = time.perf_counter()
+    app.backend.close()
+    app.destroy()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "app_to_first_frame_ms": (app.first_frame_time - imported) * 1000,
+        "app_to_ready_ms": (drawn - imported) * 1000,
+    }))
+
+
+def bench_cold_start(quick):
+    """
+Time from starting a new Python process to the first drawn frame of `App`,
+the best of a few runs
+    """
+    try:
+        make_tk_root().destroy()
+    except RuntimeError as error:
+        return {"skipped": str(error)}
+
+    runs = []
+    for _ in range(2 if quick else 5):
+        start = time.perf_counter()
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-start-child"],
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        result["process_total_ms"] = (time.perf_counter() - start) * 1000
+        runs.append(result)
+
+    return min(runs, key=lambda run: run["process_total_ms"])
+
+
+def bench_leaderboard(quick):
+    """
+Milliseconds per query of the leaderboard, on a database in memory with
+a million rounds (100 000 with `--quick`) spread over a year
+    """
+    import random
+
+    rounds = 100_000 if quick else 1_000_000
+    generator = random.Random(0)
+    now = time.time()
+    board = leaderboard.Leaderboard(":memory:")
+
+    start = time.perf_counter()
+    board.add_rounds(
+        (int(generator.expovariate(1/6)), generator.randrange(2**32), generator.randrange(1000, 300_000), None, now - generator.random() * 365 * 86400)
+        for _ in range(rounds)
+    )
+    results = {"rounds": rounds, "insert_rounds_per_second": rounds / (time.perf_counter() - start)}
+
+    queries = {
+        "top_10": lambda: board.top(10),
+        "top_10_of_today": lambda: board.top_of_day(n=10),
+        "day_summary": lambda: board.day_summary(),
+        "percentile_of": lambda: board.percentile_of(12),
+        "score_at_percentile": lambda: board.score_at_percentile(0.9),
+    }
+    for name, query in queries.items():
+        results[f"{name}_ms"] = time_calls(query, 100 if quick else 1000) * 1000
+
+    board.close()
+    return results
+
+
+BENCHMARKS = {
+    "headless_steps": bench_headless_steps,
+    "batch_steps": bench_batch_steps,
+    "collision": bench_collision,
+    "frame_time": bench_frame_time,
+    "cold_start": bench_cold_start,
+    "leaderboard": bench_leaderboard,
+}
+
+
+def git_commit():
+    """
+Returns the hash of the current git commit, or `None` outside a git repository
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=GAME_DIRECTORY
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blappy Fird performance benchmarks")
+    parser.add_argument("-o", "--output", help="write the results as JSON into this file")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a fast check")
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="blappy-fird-benchmarks-") as directory:
+        use_temporary_user_data(directory)
+        if arguments.cold_start_child:
+            cold_start_child()
+            return
+
+        report = {
+            "commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": {},
+        }
+        for name in arguments.only or BENCHMARKS:
+            print(f"running {name}...", file=sys.stderr)
+            report["results"][name] = BENCHMARKS[name](arguments.quick)
+
+    output = json.dumps(report, indent=4)
+    print(output)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
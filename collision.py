@@ -0,0 +1,173 @@
+"""
+Collision checks between the bird and the pillars, done with plain
+arithmetic on rectangles and intervals (no canvas needed).
+
+The game used to ask the canvas which items overlap the bird
+(`tk.Canvas.find_overlapping`) and decide by the sum of their tags. Here
+every pair of pillars is described by its x interval and the y interval
+of the hole between them, so checking a bird costs a few comparisons per
+pair of pillars and always gives the same result for the same positions.
+"""
+
+BIRD_HITBOXES = (
+    (7, 0, 40, 42),  # body, 33x42 rectangle
+    (39, 18, 56, 42),  # beak, 17x24 rectangle
+)
+# rectangles (x1, y1, x2, y2) covering the default bird, relative to the
+# top left corner of its image. They are smaller than the image itself so
+# the bird doesn't die due to invisible collisions
+
+
+class Bitmask:
+    """
+    This class stores which pixels of an image are opaque, made from its
+    alpha channel (see `Backend.get_mask()`), for pixel perfect collisions.
+
+    Every row of the image is packed into a single integer, where bit `x`
+    is set if the pixel at column `x` is opaque. Checking 2 masks then only
+    needs one `&` between integers for each row they share.
+    """
+    ALPHA_THRESHOLD = 128  # pixels at least this opaque are solid
+
+    def __init__(self, width, height, rows):
+        """
+- `width`, `height`: dimensions of the image
+- `rows`: list of `height` integers, one per row of pixels
+
+`self.bounding_box` is set to the smallest rectangle (x1, y1, x2, y2),
+x2 and y2 excluded, that contains every opaque pixel, or `None` if the
+image is fully transparent
+        """
+        self.width = width
+        self.height = height
+        self.rows = rows
+
+        filled_rows = [y for y, row in enumerate(rows) if row]
+        if not filled_rows:
+            self.bounding_box = None
+            return
+
+        x1 = min((row & -row).bit_length() - 1 for row in rows if row)
+        x2 = max(row.bit_length() for row in rows)
+        self.bounding_box = (x1, filled_rows[0], x2, filled_rows[-1] + 1)
+
+    @classmethod
+    def from_rgba(cls, width, height, pixels, threshold=ALPHA_THRESHOLD):
+        """
+Makes a `Bitmask` from RGBA `pixels` (4 bytes per pixel, row by row),
+like the ones returned by `backend.read_png()`
+        """
+        rows = []
+        row_length = width * 4
+        for y in range(height):
+            alpha = pixels[y*row_length + 3:(y+1)*row_length:4]
+            bits = "".join("1" if value >= threshold else "0" for value in reversed(alpha))
+            rows.append(int(bits, 2) if bits else 0)
+        return cls(width, height, rows)
+
+    def overlaps(self, other, dx, dy):
+        """
+Returns `True` if any opaque pixel of this mask touches an opaque pixel
+of `other`, when the top left corner of `other` is `(dx, dy)` pixels away
+from the top left corner of this mask (both integers)
+
+- The bounding boxes are compared first, and most calls stop there
+- Otherwise only the rows inside both bounding boxes are checked, by
+  shifting the row of `other` by `dx` bits and and-ing it with this row
+        """
+        if self.bounding_box is None or other.bounding_box is None:
+            return False
+
+        ax1, ay1, ax2, ay2 = self.bounding_box
+        bx1, by1, bx2, by2 = other.bounding_box
+        x1, x2 = max(ax1, bx1 + dx), min(ax2, bx2 + dx)
+        y1, y2 = max(ay1, by1 + dy), min(ay2, by2 + dy)
+        if x1 >= x2 or y1 >= y2:
+            return False
+
+        rows, other_rows = self.rows, other.rows
+        for y in range(y1, y2):
+            other_row = other_rows[y - dy]
+            other_row = other_row << dx if dx >= 0 else other_row >> -dx
+            if rows[y] & other_row:
+                return True
+        return False
+
+
+def bird_hitboxes(bird_x, bird_y, hitboxes=BIRD_HITBOXES):
+    """
+Returns the rectangles in `hitboxes` moved to the bird's top left corner
+`(bird_x, bird_y)`
+    """
+    return [(bird_x+x1, bird_y+y1, bird_x+x2, bird_y+y2) for x1, y1, x2, y2 in hitboxes]
+
+
+def rectangle_hits_pillar(rectangle, pillar_left, pillar_right, gap_top, gap_bottom):
+    """
+Returns `True` if `rectangle` (x1, y1, x2, y2) touches a pair of pillars
+    - the pair covers the x interval `[pillar_left, pillar_right]`
+    - the hole between the upper and lower pillar covers the y interval
+      `(gap_top, gap_bottom)`
+
+A rectangle touches the pair if it is horizontally inside the pillars
+and isn't entirely inside the hole. Touching edges count as a hit, just
+like they did with `find_overlapping`
+    """
+    x1, y1, x2, y2 = rectangle
+    if x2 < pillar_left or x1 > pillar_right:
+        return False
+    return y1 <= gap_top or y2 >= gap_bottom
+
+
+def bird_hits_pillars(bird_x, bird_y, pillars, pillar_width, gap_top_y, gap_height, hitboxes=BIRD_HITBOXES):
+    """
+Returns `True` if any rectangle of the bird touches any pair of pillars
+    - `pillars` is a list of `[x, random_shift]` pairs, like `World.pillars`
+    - `gap_top_y` is the y coordinate of the top of the hole when
+      `random_shift` is 0, and `gap_height` is the height of the hole
+
+Pairs of pillars that are horizontally away from the whole bird are
+skipped before its rectangles are checked one by one
+    """
+    rectangles = bird_hitboxes(bird_x, bird_y, hitboxes)
+    bird_left = min(rectangle[0] for rectangle in rectangles)
+    bird_right = max(rectangle[2] for rectangle in rectangles)
+
+    for pillar_left, random_shift in pillars:
+        pillar_right = pillar_left + pillar_width
+        if bird_right < pillar_left or bird_left > pillar_right:
+            continue
+
+        gap_top = gap_top_y + random_shift
+        gap_bottom = gap_top + gap_height
+        for rectangle in rectangles:
+            if rectangle_hits_pillar(rectangle, pillar_left, pillar_right, gap_top, gap_bottom):
+                return True
+    return False
+
+
+def bird_mask_hits_pillars(bird_x, bird_y, bird_mask, pillars, pillar_width, pillar_up_y, pillar_down_y, pillar_masks):
+    """
+Pixel perfect version of `bird_hits_pillars()`, returns `True` if an opaque
+pixel of the bird touches an opaque pixel of any pillar
+    - `bird_mask` is the `Bitmask` of the bird image, whose top left corner
+      is at `(bird_x, bird_y)`
+    - `pillar_up_y` and `pillar_down_y` are the y coordinates of the top left
+      corners of the upper and lower pillar when `random_shift` is 0
+    - `pillar_masks` is a tuple with the `Bitmask` of the upper and lower pillar
+
+Positions are rounded to whole pixels, like the canvas does when drawing
+    """
+    bird_x, bird_y = round(bird_x), round(bird_y)
+    pillar_up_mask, pillar_down_mask = pillar_masks
+
+    for pillar_left, random_shift in pillars:
+        dx = round(pillar_left) - bird_x
+        if dx >= bird_mask.width or dx + pillar_width <= 0:
+            continue
+
+        if bird_mask.overlaps(pillar_up_mask, dx, round(pillar_up_y + random_shift) - bird_y):
+            return True
+        if bird_mask.overlaps(pillar_down_mask, dx, round(pillar_down_y + random_shift) - bird_y):
+            return True
+    return False
@@ -0,0 +1,231 @@
+import multiprocessing
+
+import replay
+
+
+OBSERVATION_SIZE = 4  # bird y, bird velocity, distance to the next pillar, offset of its hole's center
+
+
+def observe(world):
+    """
+Returns the observation (see `BlappyFirdEnv`) of the current state of the `World` `world`
+    """
+    bird_center_x = world.bird_x + world.bird_width/2
+    bird_center_y = world.bird_y + world.bird_height/2
+
+    pillar = world.initial_pillar_positions[world.currently_tracking_index]
+    gap_top, gap_bottom = world.gap_of(pillar)
+
+    return (
+        bird_center_y,
+        world.bird_velocity,
+        pillar[0] + world.pillar_width/2 - bird_center_x,
+        (gap_top + gap_bottom)/2 - bird_center_y,
+    )
+
+
+class BlappyFirdEnv:
+    """
+    A Gym-style environment of Blappy Fird for training bots, built on
+    `world.World` (no window needed).
+
+        env = BlappyFirdEnv()
+        observation = env.reset(seed=1)
+        observation, reward, done, info = env.step(1)  # 1 = hop, 0 = don't
+
+    The observation is a tuple of 4 floats:
+        - the y coordinate of the bird's center
+        - the bird's velocity
+        - the horizontal distance from the bird's center to the center of
+          the next pillar (`initial_pillar_positions[currently_tracking_index]`)
+        - the vertical offset from the bird's center to the center of that
+          pillar's hole (positive if the hole is lower than the bird)
+
+    The reward is 1 for every pillar passed and -1 when the bird dies.
+    """
+
+    def __init__(self, pixel_perfect=False):
+        """
+- `pixel_perfect`: use the sprites' masks for collisions like the game
+  does (slightly slower), instead of the rectangle hitboxes
+        """
+        self.world = replay.make_world(pixel_perfect)
+
+    def observe(self):
+        """
+Returns the observation of the current state of `self.world`
+        """
+        return observe(self.world)
+
+    def reset(self, seed=None):
+        """
+Starts a new round with the given `seed` (a random one if `None`) and
+returns its first observation
+        """
+        self.world.reset(seed)
+        return self.observe()
+
+    def step(self, action):
+        """
+Simulates one step of the round, the bird hops if `action` is truthy
+
+Returns `(observation, reward, done, info)`, where `done` is `True` once
+the bird died and `info` is a dict with the `score` and the `frame`
+        """
+        score = self.world.current_score
+        done = self.world.step(bool(action))
+
+        reward = self.world.current_score - score
+        if done:
+            reward -= 1
+
+        info = {"score": self.world.current_score, "frame": self.world.frame}
+        return self.observe(), reward, done, info
+
+
+def run_worker(connection, start, end, pixel_perfect, shared):
+    """
+- The loop of one worker process of `VectorEnv`, which runs the
+  environments `start` to `end` (excluded)
+- It waits for commands from `connection`, reads the actions from and
+  writes the results into the shared memory arrays in `shared`, and
+  answers with `None` once it's done
+    - `("reset", seeds)`: resets its environments with the given seeds
+    - `("step", None)`: steps its environments. A finished round is reset
+      right away, its final score is stored in `shared["final_scores"]`
+    - `("close", None)`: stops the worker
+    """
+    environments = [BlappyFirdEnv(pixel_perfect) for _ in range(start, end)]
+    observations, actions = shared["observations"], shared["actions"]
+    rewards, dones, final_scores = shared["rewards"], shared["dones"], shared["final_scores"]
+
+    def write_observation(index, observation):
+        observations[index*OBSERVATION_SIZE:(index+1)*OBSERVATION_SIZE] = observation
+
+    while True:
+        command, argument = connection.recv()
+
+        if command == "reset":
+            for index, environment, seed in zip(range(start, end), environments, argument):
+                write_observation(index, environment.reset(seed))
+
+        elif command == "step":
+            for index, environment in zip(range(start, end), environments):
+                observation, reward, done, info = environment.step(actions[index])
+                if done:
+                    final_scores[index] = info["score"]
+                    observation = environment.reset()
+                write_observation(index, observation)
+                rewards[index] = reward
+                dones[index] = done
+
+        elif command == "close":
+            connection.close()
+            return
+
+        connection.send(None)
+
+
+class VectorEnv:
+    """
+    Runs `n` `BlappyFirdEnv` environments spread across worker processes,
+    so all the CPU cores can be used, and steps them all together.
+
+    The observations, actions, rewards and dones are stored in shared
+    memory arrays (`multiprocessing.RawArray`), which both the workers and
+    this process read and write directly. The only things sent through the
+    pipes are the short commands, not the data itself.
+
+    `reset()` and `step()` return NumPy arrays (so this class needs `numpy`)
+    that are views on the shared memory; copy them if they must be kept
+    after the next step.
+
+    Rounds that end are reset right away by the workers, so `step()` can be
+    called forever. `self.final_scores[i]` is the score of the last round of
+    environment `i` that ended.
+    """
+
+    def __init__(self, n, workers=None, pixel_perfect=False):
+        """
+- `n`: amount of environments
+- `workers`: amount of worker processes, by default the amount of CPU cores
+- `pixel_perfect`: passed to every `BlappyFirdEnv`
+        """
+        import numpy as np
+
+        self.n = n
+        workers = max(1, min(n, workers or multiprocessing.cpu_count()))
+
+        self.shared = {
+            "observations": multiprocessing.RawArray("d", n * OBSERVATION_SIZE),
+            "actions": multiprocessing.RawArray("b", n),
+            "rewards": multiprocessing.RawArray("d", n),
+            "dones": multiprocessing.RawArray("b", n),
+            "final_scores": multiprocessing.RawArray("q", n),
+        }
+        self.observations = np.frombuffer(self.shared["observations"], dtype=np.float64).reshape(n, OBSERVATION_SIZE)
+        self.actions = np.frombuffer(self.shared["actions"], dtype=np.int8)
+        self.rewards = np.frombuffer(self.shared["rewards"], dtype=np.float64)
+        self.dones = np.frombuffer(self.shared["dones"], dtype=np.int8).view(bool)
+        self.final_scores = np.frombuffer(self.shared["final_scores"], dtype=np.int64)
+
+        self.connections = []
+        self.processes = []
+        bounds = [n * i // workers for i in range(workers + 1)]
+        for start, end in zip(bounds, bounds[1:]):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_worker, args=(child_connection, start, end, pixel_perfect, self.shared), daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self.connections.append((parent_connection, start, end))
+            self.processes.append(process)
+
+    def send_to_workers(self, command, arguments=None):
+        """
+Sends `command` to every worker and waits until all of them are done
+    - `arguments` is an optional list with one element per environment,
+      each worker gets the slice of its own environments
+        """
+        for connection, start, end in self.connections:
+            connection.send((command, arguments[start:end] if arguments is not None else None))
+        for connection, _, _ in self.connections:
+            connection.recv()
+
+    def reset(self, seeds=None):
+        """
+Resets every environment, `seeds` is an optional list of `n` seeds
+(`None` for random ones). Returns the observations, shape `(n, 4)`
+        """
+        self.send_to_workers("reset", list(seeds) if seeds is not None else [None] * self.n)
+        return self.observations
+
+    def step(self, actions):
+        """
+Steps every environment with `actions` (`n` values, truthy = hop)
+
+Returns `(observations, rewards, dones)` as arrays of shape `(n, 4)`,
+`(n,)` and `(n,)`
+        """
+        self.actions[:] = actions
+        self.send_to_workers("step")
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        """
+Stops all the worker processes
+        """
+        for connection, _, _ in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
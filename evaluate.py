@@ -0,0 +1,186 @@
+"""
+Evaluating bots on many rounds at once, for balancing the physics of Blappy Fird.
+
+    python evaluate.py --seeds 1000
+    python evaluate.py --policy mybot:policy --seeds 200 --gap 150 170 190 --gravity 0.5 0.6
+    python evaluate.py --seeds 1000 --hop-velocity -9.5 -10.5 -o results.json
+
+A policy is a function that takes a `World` and returns `True` if the bird
+should hop in the next step, given as `module:function` (the module must
+be importable from the current directory). Every combination of the given
+physics parameters is played with the seeds 0 to `--seeds - 1`, so all the
+parameter sets are compared on the same rounds.
+
+The rounds are spread over all the CPU cores with a
+`concurrent.futures.ProcessPoolExecutor`, in chunks of seeds so that
+sending the work to the processes costs little compared to playing it.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import replay
+
+
+PARAMETERS = {
+    # option: World attribute
+    "gap": "pillar_hole_gap",
+    "distance": "pillar_distance",
+    "gravity": "gravity_acceleration",
+    "hop_velocity": "hop_velocity",
+}
+
+
+def simple_policy(world):
+    """
+A small bot: hops when the bird is falling close to the bottom of the
+hole it is flying towards
+    """
+    pillar = world.initial_pillar_positions[world.currently_tracking_index]
+    _, gap_bottom = world.gap_of(pillar)
+    return world.bird_velocity > 0 and world.bird_y + world.bird_height > gap_bottom - 25
+
+
+def load_policy(name):
+    """
+Returns the function called `name` (`module:function`)
+    """
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"a policy must be given as module:function, not {name!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def make_world(parameters, pixel_perfect=False):
+    """
+Returns a `World` (see `replay.make_world()`) with the physics changed
+to `parameters`, a dict of `World` attribute: value
+    """
+    world = replay.make_world(pixel_perfect)
+    for attribute, value in parameters.items():
+        setattr(world, attribute, value)
+    world.update_standard_pillar_positions()
+    world.update_pillar_pool()
+    world.reset()
+    return world
+
+
+def play_rounds(policy_name, parameters, seeds, max_frames, pixel_perfect):
+    """
+Runs in a worker process: plays one round per seed in `seeds` with the
+policy `policy_name` and returns a list of `(score, frames)`
+    - a round that lasts `max_frames` frames is stopped there, since a good
+      policy might never die
+    """
+    if sys.path[0] != os.getcwd():
+        sys.path.insert(0, os.getcwd())  # so the policy's module is found with every start method
+    policy = load_policy(policy_name)
+    world = make_world(parameters, pixel_perfect)
+
+    results = []
+    for seed in seeds:
+        world.reset(seed)
+        while world.frame < max_frames and not world.step(policy(world)):
+            pass
+        results.append((world.current_score, world.frame))
+    return results
+
+
+def summarize(results):
+    """
+Returns a dict describing the distribution of the scores (and the mean
+round length) of `results`, a list of `(score, frames)`
+    """
+    scores = sorted(score for score, _ in results)
+
+    def at(fraction):
+        return scores[min(len(scores) - 1, int(fraction * len(scores)))]
+
+    return {
+        "rounds": len(scores),
+        "mean": statistics.fmean(scores),
+        "stdev": statistics.pstdev(scores),
+        "min": scores[0],
+        "p10": at(0.1),
+        "median": at(0.5),
+        "p90": at(0.9),
+        "max": scores[-1],
+        "mean_frames": statistics.fmean(frames for _, frames in results),
+    }
+
+
+def evaluate(policy_name, grid, seeds, max_frames=100_000, pixel_perfect=False, workers=None, chunk_size=64):
+    """
+Plays every combination of the physics parameters in `grid` (a dict of
+`World` attribute: list of values) with `seeds` rounds each, in parallel
+
+Returns a list of dicts, one per parameter set, with its `parameters`
+and the `summarize()` of its rounds. Raises a `ValueError` if `seeds` is below 1
+    """
+    if seeds < 1:
+        raise ValueError(f"at least 1 seed is needed, not {seeds}")
+    parameter_sets = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for parameters in parameter_sets:
+            futures.append([
+                executor.submit(play_rounds, policy_name, parameters, range(start, min(start + chunk_size, seeds)), max_frames, pixel_perfect)
+                for start in range(0, seeds, chunk_size)
+            ])
+
+        report = []
+        for parameters, chunks in zip(parameter_sets, futures):
+            results = [result for chunk in chunks for result in chunk.result()]
+            report.append({"parameters": parameters, **summarize(results)})
+    return report
+
+
+def main():
+    defaults = make_world({})
+    parser = argparse.ArgumentParser(description="Plays many rounds of Blappy Fird with a bot, for every set of physics parameters")
+    parser.add_argument("--policy", default="evaluate:simple_policy", help="the bot, as module:function (default: %(default)s)")
+    parser.add_argument("--seeds", type=int, default=100, help="rounds played per parameter set (default: %(default)s)")
+    parser.add_argument("--max-frames", type=int, default=100_000, help="frames after which a round is stopped (default: %(default)s)")
+    parser.add_argument("--pixel-perfect", action="store_true", help="use the sprites' masks for collisions")
+    parser.add_argument("--workers", type=int, help="amount of processes (default: one per CPU core)")
+    parser.add_argument("-o", "--output", help="also write the results as JSON into this file")
+    for option, attribute in PARAMETERS.items():
+        parser.add_argument(
+            f"--{option.replace('_', '-')}", type=float, nargs="+", default=[getattr(defaults, attribute)],
+            help=f"values of World.{attribute} (default: %(default)s)"
+        )
+    arguments = parser.parse_args()
+    if arguments.seeds < 1:
+        parser.error("--seeds must be at least 1")
+
+    load_policy(arguments.policy)  # fail early on a wrong name
+    grid = {attribute: getattr(arguments, option) for option, attribute in PARAMETERS.items()}
+
+    start = time.perf_counter()
+    report = evaluate(arguments.policy, grid, arguments.seeds, arguments.max_frames, arguments.pixel_perfect, arguments.workers)
+    elapsed = time.perf_counter() - start
+
+    columns = list(PARAMETERS) + ["mean", "stdev", "min", "p10", "median", "p90", "max"]
+    print("".join(f"{column:>14}" for column in columns))
+    for result in report:
+        values = [result["parameters"][attribute] for attribute in PARAMETERS.values()]
+        values += [result[column] for column in columns[len(PARAMETERS):]]
+        print("".join(f"{value:>14.6g}" for value in values))
+
+    rounds = sum(result["rounds"] for result in report)
+    print(f"{rounds} rounds in {elapsed:.1f} s ({rounds / elapsed * 3600:,.0f} rounds per hour)", file=sys.stderr)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump({"policy": arguments.policy, "seeds": arguments.seeds, "results": report}, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
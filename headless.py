@@ -0,0 +1,307 @@
+"""
+Drawing rounds of Blappy Fird without a window, into NumPy arrays.
+
+    python headless.py --replay round.bfr --png-dir frames
+    python headless.py --policy evaluate:simple_policy --seed 7 --frames 2000 --raw round.rgba
+    python headless.py --replay round.bfr --raw - | ffmpeg -f rawvideo -pix_fmt rgba -s 600x500 -r 66.667 -i - round.mp4
+
+A `FrameRenderer` draws the background, the bird and the pillars of a
+`World` (and a `world.Background`) into an RGBA array of the size of the
+game window, on the same pixels and in the same order as `App` draws them
+on its canvas. tkinter isn't used at all, so this works on a server
+without a display, and much faster than the game runs in real time.
+
+Every sprite is turned into arrays once, when the renderer is made:
+    - its colors premultiplied by its alpha and `1 - alpha`, so drawing
+      it is one multiply and one add per pixel (`Sprite.draw_onto()`)
+    - fully opaque sprites (the background) are just copied
+Sprites are cut off at the edges of the frame, so pillars and background
+images that are partly (or completely) outside of it cost little.
+
+The images of the main menu and the help image of the pre round screen
+can be drawn over a frame too (`overlays`), at their places in
+`world.MAINMENU_LAYOUT`. Texts (the highscore and leaderboard labels and
+the scoreboard) aren't drawn.
+
+The frames are written as a sequence of PNG files or as raw RGBA bytes
+(`--raw`, one frame after the other), which an encoder like `ffmpeg` reads
+from a file or a pipe. A frame is one step of the game (`World.TICK_MS`
+milliseconds), so the video runs at 1000 / 15 = 66.667 frames per second,
+divided by `--every`.
+
+Needs `numpy`.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import backend
+import evaluate
+import replay
+from world import MAINMENU_LAYOUT, Background, World
+
+
+class Sprite:
+    """
+    An image prepared for being drawn many times onto RGBA frames.
+
+    `self.color` holds the RGB of every pixel multiplied by its alpha, and
+    `self.transparency` holds `255 - alpha`, so the pixels below the sprite
+    are kept by that fraction (both as `uint16`, so the products fit).
+    A sprite without any transparent pixel is copied instead (`self.opaque`).
+    """
+
+    def __init__(self, width, height, pixels):
+        """
+- `width`, `height`, `pixels`: an RGBA image, like the ones returned by
+  `backend.read_png()` and `AtlasReader.load_pixels()`
+        """
+        self.width = width
+        self.height = height
+
+        self.rgba = np.frombuffer(bytes(pixels), dtype=np.uint8).reshape(height, width, 4)
+        alpha = self.rgba[:, :, 3:].astype(np.uint16)
+        self.opaque = bool((alpha == 255).all())
+        self.color = self.rgba * alpha + 127  # + 127 rounds the division by 255 in `draw_onto()`
+        self.color[:, :, 3] = 255 * 255  # the frames stay opaque
+        self.transparency = 255 - alpha
+
+    def draw_onto(self, frame, x, y):
+        """
+Draws the sprite onto `frame` (a `uint8` array of shape `(height, width, 4)`)
+with its top left corner at the integer coordinates `(x, y)`
+    - only the part of the sprite inside `frame` is drawn, nothing if the
+      sprite is completely outside of it
+        """
+        frame_height, frame_width = frame.shape[:2]
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + self.width, frame_width), min(y + self.height, frame_height)
+        if left >= right or top >= bottom:
+            return
+
+        area = frame[top:bottom, left:right]
+        sprite_area = (slice(top - y, bottom - y), slice(left - x, right - x))
+        if self.opaque:
+            area[:] = self.rgba[sprite_area]
+        else:
+            area[:] = (area * self.transparency[sprite_area] + self.color[sprite_area]) // 255
+
+
+class FrameRenderer:
+    """
+    This class draws frames of a round, see the top of this file.
+
+    The sprites are the default background, bird, pillar and menu images
+    of `Backend`, read from the atlas just like the game reads them, but
+    by an `AtlasReader`: no `Backend` is made, so nothing is read from or
+    written into the player's user data directory.
+    """
+
+    def __init__(self, atlas=None, width=600, height=500):
+        """
+- `atlas`: the `backend.AtlasReader` the images are read with, a new one by default
+- `width`, `height`: the size of the game window, which is the size of the frames
+        """
+        if atlas is None:
+            atlas = backend.AtlasReader()
+        self.width = width
+        self.height = height
+
+        images = backend.Backend
+        self.background_sprite = Sprite(*atlas.load_pixels(images.DEFAULT_BACKGROUND))
+        self.bird_sprite = Sprite(*atlas.load_pixels(images.DEFAULT_BIRD))
+        self.pillar_up_sprite = Sprite(*atlas.load_pixels(images.DEFAULT_PILLAR_UP))
+        self.pillar_down_sprite = Sprite(*atlas.load_pixels(images.DEFAULT_PILLAR_DOWN))
+
+        self.layout = MAINMENU_LAYOUT
+        self.overlay_sprites = {
+            "play_button": Sprite(*atlas.load_pixels(images.PLAY_BUTTON)),
+            "exit_button": Sprite(*atlas.load_pixels(images.EXIT_BUTTON)),
+            "logo": Sprite(*atlas.load_pixels(images.LOGO)),
+            "help": Sprite(*atlas.load_pixels(images.HELP)),
+        }
+
+        self.frame = np.zeros((height, width, 4), dtype=np.uint8)
+        self.empty_frame = np.zeros((height, width, 4), dtype=np.uint8)
+        self.empty_frame[:, :, 3] = 255  # opaque black, where nothing is drawn
+
+    def render(self, world, background, pillars=True, overlays=()):
+        """
+Draws the state of `world` and `background` and returns the frame, an
+array of shape `(height, width, 4)` of `uint8` RGBA pixels
+    - the images are drawn in the order of `App`'s canvas: the background
+      images (in the order they were made in), the bird, then the pillars
+      (only if `pillars` is `True`, they are hidden outside of a round)
+    - then the images named in `overlays` (keys of `world.MAINMENU_LAYOUT`,
+      `("play_button", "exit_button", "logo")` for the main menu and
+      `("help",)` for the pre round screen), centered on their places like
+      tkinter centers them. The names of texts are skipped
+    - the coordinates are rounded like `App` rounds them
+    - the returned array is reused by the next call, copy it to keep it
+        """
+        frame = self.frame
+        frame[:] = self.empty_frame
+
+        for x in background.positions:
+            self.background_sprite.draw_onto(frame, round(x), 0)
+        self.bird_sprite.draw_onto(frame, round(world.bird_x), round(world.bird_y))
+
+        if pillars:
+            for x, random_shift in world.initial_pillar_positions:
+                x = round(x)
+                self.pillar_up_sprite.draw_onto(frame, x, round(world.STANDARD_PILLAR_UP_Y + random_shift))
+                self.pillar_down_sprite.draw_onto(frame, x, round(world.STANDARD_PILLAR_DOWN_Y + random_shift))
+
+        for name in overlays:
+            sprite = self.overlay_sprites.get(name)
+            if sprite is not None:
+                x, y = self.layout[name]
+                sprite.draw_onto(frame, round(self.width/2 + x) - sprite.width//2, round(y) - sprite.height//2)
+
+        return frame
+
+
+def play(world, background, hop, max_frames=None):
+    """
+Steps the round in `world` (which must be reset already) together with
+`background`, and yields after every step (and once before the first)
+so the frame can be drawn
+    - `hop(world)` is called before every step, the bird hops if it returns `True`
+    - stops once the bird died (after yielding the state it died in) or
+      after `max_frames` steps
+    """
+    yield world
+    while not world.game_over and (max_frames is None or world.frame < max_frames):
+        world.step(hop(world))
+        background.scroll()
+        yield world
+
+
+class FrameWriter:
+    """
+    Writes frames one after the other, either as PNG files named
+    `frame_000000.png`, `frame_000001.png`... in a directory, or as raw
+    RGBA bytes into a file (or the standard output, `-`).
+
+    Compressing a PNG file takes longer than drawing its frame, so the PNG
+    files are written by a pool of threads (`zlib` runs outside of the GIL,
+    so they use every CPU core). At most `2 * workers` frames wait for their
+    thread, so a slow disk can't make them pile up in memory.
+    """
+
+    def __init__(self, png_directory=None, raw_path=None, compression=1, workers=None):
+        """
+- `png_directory` or `raw_path`: where the frames go, exactly one of them
+- `compression`: the zlib level of the PNG files, see `backend.write_png()`
+- `workers`: amount of threads writing PNG files (default: one per CPU core)
+        """
+        self.png_directory = png_directory
+        self.compression = compression
+        self.count = 0
+        self.raw_file = None
+        self.pool = None
+        self.pending = deque()  # futures of the PNG files being written, oldest first
+
+        if png_directory is not None:
+            Path(png_directory).mkdir(parents=True, exist_ok=True)
+            self.workers = workers or os.cpu_count() or 1
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="FrameWriter")
+        elif raw_path == "-":
+            self.raw_file = sys.stdout.buffer
+        else:
+            self.raw_file = open(raw_path, "wb")
+
+    def write(self, frame):
+        """
+Writes `frame`, an array like the ones returned by `FrameRenderer.render()`
+    - the array can be changed right after, its pixels are copied
+        """
+        if self.raw_file is not None:
+            self.raw_file.write(frame.data)
+        else:
+            while len(self.pending) >= 2 * self.workers:
+                self.pending.popleft().result()
+
+            height, width = frame.shape[:2]
+            path = os.path.join(self.png_directory, f"frame_{self.count:06d}.png")
+            self.pending.append(self.pool.submit(backend.write_png, path, width, height, frame.tobytes(), self.compression))
+        self.count += 1
+
+    def close(self):
+        """
+Waits until every frame is written and closes the output
+    - errors of the threads (like a full disk) are raised here
+        """
+        if self.pool is not None:
+            while self.pending:
+                self.pending.popleft().result()
+            self.pool.shutdown()
+        elif self.raw_file is sys.stdout.buffer:
+            self.raw_file.flush()
+        else:
+            self.raw_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draws a round of Blappy Fird without a window, into PNG files or raw RGBA frames")
+    round_source = parser.add_mutually_exclusive_group(required=True)
+    round_source.add_argument("--replay", help="replay file of the round")
+    round_source.add_argument("--policy", help="bot playing the round, as module:function like in evaluate.py")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--png-dir", help="directory the frames are written into as PNG files")
+    output.add_argument("--raw", help="file the frames are written into as raw RGBA bytes, - for the standard output")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the round played by --policy (default: %(default)s)")
+    parser.add_argument("--pixel-perfect", action="store_true", help="use the sprites' masks for collisions (with --policy)")
+    parser.add_argument("--frames", type=int, help="stop after this many steps (default: when the bird dies)")
+    parser.add_argument("--every", type=int, default=1, help="only write every n-th frame (default: %(default)s)")
+    parser.add_argument("--compression", type=int, default=1, help="zlib level of the PNG files, 0 to 9 (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="threads writing PNG files (default: one per CPU core)")
+    arguments = parser.parse_args()
+    if arguments.every < 1:
+        parser.error("--every must be at least 1")
+
+    renderer = FrameRenderer()
+    if arguments.replay:
+        recorded = replay.decode_replay(Path(arguments.replay).read_bytes())
+        world = replay.make_world(recorded["pixel_perfect"])
+        world.reset(recorded["seed"])
+        world.bird_y = recorded["start_y"]
+        hop_frames = set(recorded["hop_frames"])
+        def hop(world):
+            return world.frame in hop_frames
+        max_frames = recorded["frames"] if arguments.frames is None else min(arguments.frames, recorded["frames"])
+    else:
+        world = replay.make_world(arguments.pixel_perfect)
+        world.reset(arguments.seed)
+        hop = evaluate.load_policy(arguments.policy)
+        max_frames = arguments.frames
+
+    background = Background(renderer.width)
+    writer = FrameWriter(arguments.png_dir, arguments.raw, arguments.compression, arguments.workers)
+    start = time.perf_counter()
+    for _ in play(world, background, hop, max_frames):
+        if world.frame % arguments.every == 0:
+            writer.write(renderer.render(world, background))
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    game_seconds = world.frame * World.TICK_MS / 1000
+    print(
+        f"{writer.count} frames of {world.frame} steps (score {world.current_score}) in {elapsed:.2f} s, "
+        f"{game_seconds / elapsed:.1f}x real time", file=sys.stderr
+    )
+    if arguments.raw:
+        print(
+            f"encode with: ffmpeg -f rawvideo -pix_fmt rgba -s {renderer.width}x{renderer.height} "
+            f"-r {1000 / World.TICK_MS / arguments.every:.3f} -i {arguments.raw} round.mp4", file=sys.stderr
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+The local leaderboard of Blappy Fird, a SQLite database in the game's user
+data directory (see `Backend.get_leaderboard()`).
+
+Every finished round is one row of the `rounds` table, and its replay file
+(see `replay.py`) is stored in the `replays` table with the same id. The
+queries the game needs are answered from indexes, never by reading the
+whole table:
+    - the best rounds: the `(profile, score)` index, read from the top
+    - the best rounds of a day: the `(profile, day, score)` index
+    - how many rounds were played and the best score of a day: the
+      `daily_stats` table, one row per day
+    - percentiles: the `score_counts` table, one row per distinct score
+      (a few hundred rows, even for millions of rounds)
+`daily_stats` and `score_counts` are kept up to date by triggers whenever a
+round is added, so they can't go out of sync with `rounds`.
+"""
+import sqlite3
+import time
+
+DEFAULT_PROFILE = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    played_at REAL NOT NULL,  -- unix timestamp of the end of the round
+    day TEXT NOT NULL,  -- local date of played_at, YYYY-MM-DD
+    seed INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_by_score ON rounds (profile, score DESC, played_at);
+CREATE INDEX IF NOT EXISTS rounds_by_day ON rounds (profile, day, score DESC);
+
+CREATE TABLE IF NOT EXISTS replays (
+    round_id INTEGER PRIMARY KEY REFERENCES rounds (id),
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS score_counts (
+    profile TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    PRIMARY KEY (profile, score)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    profile TEXT NOT NULL,
+    day TEXT NOT NULL,
+    rounds INTEGER NOT NULL,
+    best INTEGER NOT NULL,
+    PRIMARY KEY (profile, day)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS count_round AFTER INSERT ON rounds BEGIN
+    INSERT INTO score_counts (profile, score, rounds) VALUES (NEW.profile, NEW.score, 1)
+        ON CONFLICT (profile, score) DO UPDATE SET rounds = rounds + 1;
+    INSERT INTO daily_stats (profile, day, rounds, best) VALUES (NEW.profile, NEW.day, 1, NEW.score)
+        ON CONFLICT (profile, day) DO UPDATE SET rounds = rounds + 1, best = max(best, excluded.best);
+END;
+"""
+
+ROUND_COLUMNS = "id, score, played_at, day, seed, duration_ms"
+
+
+def day_of(timestamp):
+    """
+Returns the local date of the unix timestamp `timestamp` as `YYYY-MM-DD`
+    """
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+class Leaderboard:
+    """
+    This class stores the finished rounds of every profile in a SQLite
+    database and answers the leaderboard queries of the game.
+
+    The rows returned by the queries are `sqlite3.Row` objects, which
+    work like dicts with the keys `id`, `score`, `played_at`, `day`,
+    `seed` and `duration_ms`.
+    """
+
+    def __init__(self, path):
+        """
+- Opens (or makes) the database file at `path`, `":memory:"` works too
+- The database uses write-ahead logging with `synchronous=NORMAL`, so
+  adding a round doesn't wait for the disk to sync (only the last rounds
+  can be lost if the computer turns off, the database can't break)
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def add_round(self, score, seed, duration_ms, replay=None, played_at=None, profile=DEFAULT_PROFILE):
+        """
+Stores a finished round and returns its id
+    - `replay`: the bytes of the round's replay file, if any
+    - `played_at`: unix timestamp of the end of the round, now by default
+        """
+        return self.add_rounds([(score, seed, duration_ms, replay, played_at)], profile)[0]
+
+    def add_rounds(self, rounds, profile=DEFAULT_PROFILE):
+        """
+Stores many rounds in one transaction, each given as a tuple
+`(score, seed, duration_ms, replay, played_at)` like the arguments of
+`self.add_round()`. Returns the list of their ids
+        """
+        ids = []
+        with self.connection:
+            for score, seed, duration_ms, replay, played_at in rounds:
+                if played_at is None:
+                    played_at = time.time()
+                cursor = self.connection.execute(
+                    "INSERT INTO rounds (profile, score, played_at, day, seed, duration_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                    (profile, score, played_at, day_of(played_at), seed, duration_ms)
+                )
+                if replay is not None:
+                    self.connection.execute("INSERT INTO replays (round_id, data) VALUES (?, ?)", (cursor.lastrowid, replay))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def top(self, n=10, profile=DEFAULT_PROFILE):
+        """
+Returns the `n` best rounds, the earliest first among equal scores
+        """
+        return self.connection.execute(
+            f"SELECT {ROUND_COLUMNS} FROM rounds WHERE profile = ? ORDER BY score DESC, played_at LIMIT ?",
+            (profile, n)
+        ).fetchall()
+
+    def top_of_day(self, day=None, n=10, profile=DEFAULT_PROFILE):
+        """
+Returns the `n` best rounds played on `day` (`YYYY-MM-DD`, today by default)
+        """
+        return self.connection.execute(
+            f"SELECT {ROUND_COLUMNS} FROM rounds WHERE profile = ? AND day = ? ORDER BY score DESC LIMIT ?",
+            (profile, day or day_of(time.time()), n)
+        ).fetchall()
+
+    def day_summary(self, day=None, profile=DEFAULT_PROFILE):
+        """
+Returns `(rounds, best_score)` of `day` (`YYYY-MM-DD`, today by default),
+`(0, None)` if no round was played that day
+        """
+        row = self.connection.execute(
+            "SELECT rounds, best FROM daily_stats WHERE profile = ? AND day = ?",
+            (profile, day or day_of(time.time()))
+        ).fetchone()
+        return (row["rounds"], row["best"]) if row else (0, None)
+
+    def percentile_of(self, score, profile=DEFAULT_PROFILE):
+        """
+Returns the fraction (0 to 1) of the rounds with a lower score than
+`score`, 0 if there are no rounds
+        """
+        lower, total = self.connection.execute(
+            "SELECT coalesce(sum(CASE WHEN score < ? THEN rounds END), 0), coalesce(sum(rounds), 0) "
+            "FROM score_counts WHERE profile = ?",
+            (score, profile)
+        ).fetchone()
+        return lower / total if total else 0
+
+    def score_at_percentile(self, fraction, profile=DEFAULT_PROFILE):
+        """
+Returns the score reached or beaten by the best `1 - fraction` of the
+rounds (`fraction` 0.5 is the median, 0.9 the 90th percentile), `None`
+if there are no rounds
+        """
+        counts = self.connection.execute(
+            "SELECT score, rounds FROM score_counts WHERE profile = ? ORDER BY score", (profile,)
+        ).fetchall()
+        total = sum(rounds for _, rounds in counts)
+        seen = 0
+        for score, rounds in counts:
+            seen += rounds
+            if seen > fraction * total:
+                return score
+        return counts[-1][0] if counts else None
+
+    def get_replay(self, round_id):
+        """
+Returns the bytes of the replay file of the round `round_id`, or `None`
+        """
+        row = self.connection.execute("SELECT data FROM replays WHERE round_id = ?", (round_id,)).fetchone()
+        return row["data"] if row else None
+
+    def close(self):
+        """
+- Closes the connection to the database file, the leaderboard can't be used after this
+        """
+        self.connection.close()
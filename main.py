@@ -1,6 +1,15 @@
-import random
-import tkinter as tk
-import backend
+import math
+import sys
+import time
+import performance  # first, so `performance.startup` measures the imports below
+with performance.startup.phase("import tkinter"):
+    import tkinter as tk
+with performance.startup.phase("import backend"):
+    import backend
+with performance.startup.phase("import replay, sprites, world"):
+    import replay
+    import sprites
+    import world
 
 
 class App(tk.Tk):
@@ -10,28 +19,61 @@ class App(tk.Tk):
     object and using it throughout the class because I have no idea, it just looks cooler.
 
     Jokes apart, I did this so that the `App` class acts like a `tk.Tk` window itself.
+
+    `target_fps` is the amount of frames per second the game loop tries to draw.
+    If `run` is `False`, the window is set up but `mainloop()` isn't called,
+    so tools like the benchmarks can drive the game themselves
+
+    Every part of the startup is timed by `performance.startup`, see `main()`
     """
-    def __init__(self):
-        super().__init__()  # creates a Tk window
+    MAINMENU_LAYOUT = world.MAINMENU_LAYOUT  # see `world.MAINMENU_LAYOUT`
 
-        self.gravity_enabled = False
-        self.main_menu_screen = True
+    def __init__(self, target_fps=60, run=True):
+        with performance.startup.phase("Backend.__init__"):
+            self.backend = backend.Backend()
+        with performance.startup.phase("Backend.prefetch_assets"):
+            self.backend.prefetch_assets()
+        # the asset files are read while tkinter makes the window
+
+        with performance.startup.phase("tk.Tk.__init__"):
+            super().__init__()  # creates a Tk window
 
-        self.backend = backend.Backend()
+        self.main_menu_screen = True
+        self.round_running = False
+        self.target_fps = target_fps
 
         self.canvas_bg_images : list[int] = []
         self.canvas_pillar_images: list[tuple[int, int]] = []
-        self.current_score = 0
 
-        self.store_currently_used_assets()
-        self.init_window()
-        self.init_background()
-        self.init_bird()
-        self.init_mainmenu()
-        self.init_pillars()
-        self.init_scoreboard()
+        for init in (
+            self.init_window,
+            self.init_background,  # the first frame is drawn here
+            self.store_currently_used_assets,
+            self.init_world,
+            self.init_bird,
+            self.init_mainmenu,
+            self.init_pillars,
+            self.init_scoreboard,
+            self.init_performance_hud,
+            self.init_scaling,
+            self.init_game_loop,
+        ):
+            with performance.startup.phase(f"App.{init.__name__}"):
+                init()
+
+        if run:
+            performance.startup.start("first mainloop iteration")
+            self.after_idle(self.finish_startup)
+            self.mainloop()
 
-        self.mainloop()
+    def finish_startup(self):
+        """
+Called by `mainloop()` once it handled all the events waiting after the
+startup (like the window being drawn), which ends `performance.startup`
+        """
+
+        performance.startup.stop("first mainloop iteration")
+        performance.startup.finish()
 
     def store_currently_used_assets(self):
         """
@@ -39,46 +81,68 @@ class App(tk.Tk):
   `tk.PhotoImage` objects of the image paths defined in the `Backend` class
 
 Defines these class attributes, each of them storing `tk.PhotoImage` objects
-of all the currently used assets in the game
-    - `self.background_image`
-    - `self.player_icon_image`
+of the currently used assets in the game
+    - `self.player_icon_image`, also set as the icon of the window
     - `self.pillar_up_image` and `self.pillar_down_image`
-    - `self.help_image`
+    - `self.play_button_image` and `self.exit_button_image`
     - `self.logo_image`
 
+It is called once the window and the background are already drawn (see
+`self.init_background()`), so they show up before everything else is decoded.
+The help image is only decoded when it is shown the first time, see `self.show_help()`
+
+The `collision.Bitmask` objects of the bird and pillar images are also stored
+in `self.player_mask` and `self.pillar_masks`, for pixel perfect collisions
+
 These attributes will be useful in drawing the widgets on the canvas later on
         """
 
-        self.background_image = self.backend.get_current_bg_image()
         self.player_icon_image = self.backend.get_current_player_image()
+        self.iconphoto(True, self.player_icon_image)
         self.pillar_up_image, self.pillar_down_image = self.backend.get_current_pillar_images()
 
         self.play_button_image, self.exit_button_image = self.backend.get_buttons_images()
-        self.help_image = self.backend.get_help_image()
         self.logo_image = self.backend.get_logo_image()
 
+        self.player_mask = self.backend.get_current_player_mask()
+        self.pillar_masks = self.backend.get_current_pillar_masks()
+
     def init_window(self):
         """
 This method configures the game window:
     - Title set to "Blappy Fird"
-    - Resizable property set to False
-    - Title bar icon added
+    - Resizable property set to True, the game is scaled to fit the
+      window (see `self.init_scaling()`)
+    - Title bar icon added later, by `self.store_currently_used_assets()`
+    - Closing the window calls `self.exit_game()`
 
 Class attributes that will be used later are defined:
     - `self.game_window_width`: 600
     - `self.game_window_height`: 500
+      These are the logical dimensions of the game, every position in the
+      game (and in `self.world`) uses logical coordinates, which are
+      multiplied by `self.scale` when drawn
     - `self.canvas`: a `tk.Canvas` widget placed in the window.
       It is stretched to fit the entire window and is the only widget
       present in the window. All the images will be drawn inside the canvas itself
 
+The scale is `self.zoom / self.subsample`, 1 until the window is resized.
+The canvas items drawn with `self.create_scaled_image()` and
+`self.create_scaled_text()` are stored in these dicts, so they can be
+scaled again later:
+    - `self.item_images`: item tag: its unscaled `tk.PhotoImage`
+    - `self.item_scaled_images`: item tag: the scaled `tk.PhotoImage` it shows
+    - `self.item_positions`: item tag: its logical coordinates
+    - `self.item_fonts`: item tag: its unscaled font
+
 Ensures the game window spawns in the center of the screen
     - Done by getting the user's screen dimensions and configuring
       `self.geometry` accordingly
         """
 
         self.title("Blappy Fird")
-        self.resizable(False, False)
-        self.iconphoto(True, self.backend.get_current_player_image())
+        self.resizable(True, True)
+        self.protocol("WM_DELETE_WINDOW", self.exit_game)
 
         user_screen_width = self.winfo_screenwidth()
         user_screen_height = self.winfo_screenheight()
@@ -90,9 +154,209 @@ Ensures the game window spawns in the center of the screen
         pos_y = int((user_screen_height - self.game_window_height)/2)
 
         self.geometry(f"{self.game_window_width}x{self.game_window_height}+{pos_x}+{pos_y}")
-        self.canvas = tk.Canvas(self, height=self.game_window_height, width=self.game_window_width)
+        self.minsize(self.game_window_width // 2, self.game_window_height // 2)
+        self.canvas = tk.Canvas(
+            self, height=self.game_window_height, width=self.game_window_width,
+            background="black", highlightthickness=0
+        )
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        self.zoom = self.subsample = 1
+        self.scale = 1
+        self.item_images = {}
+        self.item_scaled_images = {}
+        self.item_positions = {}
+        self.item_fonts = {}
+
+    # scaling
+    def init_scaling(self):
+        """
+Called after everything else is drawn:
+    - `self.letterbox_bars`: 4 black rectangles covering the parts of the
+      canvas left, right, above and below the game, when the window doesn't
+      have the game's aspect ratio
+    - Resizing the canvas calls `self.resize_game()`
+    - F11 toggles fullscreen
+        """
+
+        self.letterbox_bars = [self.canvas.create_rectangle(0, 0, 0, 0, fill="black", outline="") for i in range(4)]
+        self.canvas.bind("<Configure>", lambda e: self.resize_game(e.width, e.height))
+        self.bind("<F11>", lambda e: self.attributes("-fullscreen", not self.attributes("-fullscreen")))
+
+    def scale_image(self, image):
+        """
+Returns `image` scaled by `self.scale`, see `backend.Backend.scale_image()`
+        """
+
+        return self.backend.scale_image(image, self.zoom, self.subsample)
+
+    def create_scaled_image(self, x, y, image, **options):
+        """
+Draws `image`, scaled by `self.scale`, at the logical coordinates `(x, y)`
+and returns its tag. `options` are passed to `self.canvas.create_image()`
+    - if `image` is `None`, the item stays empty until `self.set_scaled_image()`
+        """
+
+        item = self.canvas.create_image(x * self.scale, y * self.scale, **options)
+        self.item_positions[item] = (x, y)
+        if image is not None:
+            self.set_scaled_image(item, image)
+        return item
+
+    def set_scaled_image(self, item, image):
+        """
+Makes the canvas image `item` show `image`, scaled by `self.scale`
+        """
+
+        scaled_image = self.scale_image(image)
+        self.item_images[item] = image
+        self.item_scaled_images[item] = scaled_image
+        self.canvas.itemconfigure(item, image=scaled_image)
+
+    def create_scaled_text(self, x, y, font, **options):
+        """
+Draws a text at the logical coordinates `(x, y)`, with the size of `font`
+(a tuple like `("Calibri", 18, "bold")`) scaled by `self.scale`, and
+returns its tag. `options` are passed to `self.canvas.create_text()`
+        """
+
+        item = self.canvas.create_text(x * self.scale, y * self.scale, font=self.scale_font(font), **options)
+        self.item_fonts[item] = font
+        self.item_positions[item] = (x, y)
+        return item
+
+    def scale_font(self, font):
+        """
+Returns `font` with its size multiplied by `self.scale`
+        """
+
+        family, size, *style = font
+        return (family, max(1, round(size * self.scale)), *style)
+
+    def choose_scale(self, width, height):
+        """
+Returns `(zoom, subsample)`, the biggest scale at which the game fits
+in a canvas of `width` x `height` pixels
+    - above 1 the scale goes in steps of 0.5 (1.5, 2, 2.5...) and below 1
+      it is 1/2, 1/3 or 1/4, so `tk.PhotoImage.zoom()` and `subsample()`
+      never make huge images in between and the pixels stay sharp
+        """
+
+        fit = min(width / self.game_window_width, height / self.game_window_height)
+        if fit >= 1:
+            zoom, subsample = int(fit * 2), 2
+        else:
+            zoom, subsample = 1, min(4, math.ceil(1 / max(fit, 0.25)))
+
+        divisor = math.gcd(zoom, subsample)
+        return zoom // divisor, subsample // divisor
+
+    def resize_game(self, width, height):
+        """
+Called whenever the canvas is resized to `width` x `height` pixels
+    - if another scale fits better, `self.apply_scale()` scales everything
+    - the game is centered in the canvas with `self.center_game()`
+        """
+
+        zoom, subsample = self.choose_scale(width, height)
+        if (zoom, subsample) != (self.zoom, self.subsample):
+            self.zoom, self.subsample = zoom, subsample
+            self.scale = zoom / subsample
+            self.apply_scale()
+
+        self.center_game(width, height)
+
+    def apply_scale(self):
+        """
+Redraws every canvas item at `self.scale`
+    - every image is swapped for its scaled version, which
+      `self.backend` only makes once per scale and then keeps
+    - the menu items, texts and their fonts are moved and resized
+    - the sizes of the items and the viewport of `self.background_sprites`
+      and `self.pillar_sprites` are updated, then the background, the
+      bird and the pillars are drawn again
+
+Nothing is scaled while the window keeps its size, every frame only
+multiplies the positions by `self.scale`
+        """
+
+        for item, image in self.item_images.items():
+            scaled_image = self.scale_image(image)
+            self.item_scaled_images[item] = scaled_image
+            self.canvas.itemconfigure(item, image=scaled_image)
+
+        for item, (x, y) in self.item_positions.items():
+            self.canvas.coords(item, x * self.scale, y * self.scale)
+
+        for item, font in self.item_fonts.items():
+            self.canvas.itemconfigure(item, font=self.scale_font(font))
+
+        viewport = (self.game_window_width * self.scale, self.game_window_height * self.scale)
+        for sprite_group, items in (
+            (self.background_sprites, self.canvas_bg_images),
+            (self.pillar_sprites, [item for pair in self.canvas_pillar_images for item in pair]),
+        ):
+            sprite_group.set_viewport(*viewport)
+            for item in items:
+                sprite_group.add(item, self.item_scaled_images[item].width(), self.item_scaled_images[item].height())
+
+        self.drawn_bird_position = None
+        self.draw_background()
+        self.draw_bird()
+        self.draw_pillars()
+
+    def center_game(self, width, height):
+        """
+Centers the game in the canvas of `width` x `height` pixels, by scrolling
+the view of the canvas so that its logical (0, 0) is at the top left
+corner of the game, and covers the rest of the canvas with `self.letterbox_bars`
+        """
+
+        game_width = self.game_window_width * self.scale
+        game_height = self.game_window_height * self.scale
+        left = max(0, (width - game_width) // 2)
+        top = max(0, (height - game_height) // 2)
+        right, bottom = width - left, height - top  # in canvas coordinates
+
+        self.canvas.configure(scrollregion=(-left, -top, right, bottom))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+
+        bars = (
+            (-left, -top, 0, bottom),
+            (game_width, -top, right, bottom),
+            (0, -top, game_width, 0),
+            (0, game_height, game_width, bottom),
+        )
+        for bar, coordinates in zip(self.letterbox_bars, bars):
+            self.canvas.coords(bar, *coordinates)
+            self.canvas.lift(bar)
+        for item in self.hud_items:
+            self.canvas.lift(item)
+
+    def init_world(self):
+        """
+- `self.world`: a `world.World` object which simulates the rounds of the game
+    - it stores the positions of the bird and the pillars, the velocity
+      of the bird, the score and whether the player lost
+    - `App` only draws whatever is stored in it on the canvas
+
+- The sizes and masks of the bird and pillar images are passed to it,
+  since they are needed for the score and collision checks
+
+- `self.interpolation`: how far the frame being drawn is between the
+  state before the last step and the current state (0 to 1), see `self.interpolate()`
+        """
+
+        self.world = world.World(
+            self.game_window_width, self.game_window_height,
+            bird_size=(self.player_icon_image.width(), self.player_icon_image.height()),
+            pillar_size=(self.pillar_up_image.width(), self.pillar_up_image.height()),
+            bird_mask=self.player_mask, pillar_masks=self.pillar_masks
+        )
+        self.interpolation = 1
+        self.save_previous_state()
+
     def init_background(self):
         """
 - 3 background images placed side to side are drawn onto the canvas
@@ -104,89 +368,78 @@ Ensures the game window spawns in the center of the screen
     - `self.canvas.move(tag, x_increment, y_increment)` for example can be used
       to move a drawn widget by `x_increment` and `y_increment` pixels via its tag
 
-- `self.scroll_background()` method is called
+- `self.background`: a `world.Background`, which scrolls the images (the x
+  coordinates of the images in `self.canvas_bg_images` are stored in it,
+  so the canvas never has to be asked)
+- `self.background_sprites`: a `sprites.SpriteGroup` which draws the 3
+  images, moving all the visible ones with a single canvas call
+
+- `self.background_image`: the `tk.PhotoImage` of the background, the first
+  asset decoded, so the window is shown with its background as soon as possible
+- `self.first_frame_time`: `time.perf_counter()` right after that first frame
         """
 
-        bg_img1 = self.canvas.create_image(0, 0, image=self.background_image, anchor=tk.NW)
-        bg_img2 = self.canvas.create_image(self.game_window_width, 0, image=self.background_image, anchor=tk.NW)
-        bg_img3 = self.canvas.create_image(self.game_window_width * 2, 0, image=self.background_image, anchor=tk.NW)
+        self.background_image = self.backend.get_current_bg_image()
+        bg_img1 = self.create_scaled_image(0, 0, self.background_image, anchor=tk.NW)
+        bg_img2 = self.create_scaled_image(self.game_window_width, 0, self.background_image, anchor=tk.NW)
+        bg_img3 = self.create_scaled_image(self.game_window_width * 2, 0, self.background_image, anchor=tk.NW)
 
         self.canvas_bg_images = [bg_img1, bg_img2, bg_img3]
+        self.background = world.Background(self.game_window_width, len(self.canvas_bg_images))
+        self.background_sprites = sprites.SpriteGroup(self.canvas, "background", self.game_window_width, self.game_window_height)
+        for img, x in zip(self.canvas_bg_images, self.background.positions):
+            self.background_sprites.add(img, self.background_image.width(), self.background_image.height(), x, 0)
+
         self.update()
-        self.scroll_background()
+        self.first_frame_time = time.perf_counter()
+        performance.startup.record("until the first frame", performance.startup.started)
 
     def scroll_background(self):
         """
-- This is a recursive method running in its own separate thread
-  (using tkinter's `self.after(milliseconds, function_obj)` method)
-
-- On each call, it iterates through the `self.canvas_bg_images`
-  and moves each background image to the left by 2 pixels
+- Called by `self.update_game()` on every step
 
-- Calls the `self.shift_unseen_background()` method, explained below
-
-- Runs every 50 milliseconds in a separate thread to not block the
-  main thread events
+- Scrolls `self.background` by one step, which moves every image to the
+  left and shifts the one that went out of view to the right side
+  (see `world.Background.shift_unseen()`)
         """
-        for img in self.canvas_bg_images:
-            self.canvas.move(img, -2, 0)
 
-        self.shift_unseen_background()
-        self.after(50, self.scroll_background)
+        self.background.scroll()
 
-    def shift_unseen_background(self):
+    def draw_background(self):
         """
-This method checks if the first background image has gone out of view
-or not
-    - Since the image and the window have a 600 pixel width, it checks
-      if the top left corner of the first image is less than -602
-
-If it is, the image is shifted to the right side of the third image,
-basically by around (600*2) units, since that's the width of 2 images placed side to side
-    - This shift is also done to the `self.canvas_bg_images` list
-      so that it is in sync with the visual order of the images
+Draws the background images with `self.background_sprites`, between
+their positions before and after the last step (see `self.interpolate()`),
+scaled by `self.scale`
+    - an image that was just shifted to the right side is drawn at its
+      new position, instead of sliding across the window
         """
 
-        x_coord_of_first_img, _ = self.canvas.coords(self.canvas_bg_images[0])
-
-        if x_coord_of_first_img < -self.game_window_width-2:  # out of the screen
-            increment = 2*self.game_window_width - 5
-            # shift to the right side of the last background image
-
-            self.canvas.move(self.canvas_bg_images[0], increment, 0)
-
-            first_bg_img = self.canvas_bg_images.pop(0)
-            self.canvas_bg_images.append(first_bg_img)
+        placements = []
+        for img, x, previous_x in zip(self.canvas_bg_images, self.background.positions, self.previous_background_positions):
+            if previous_x < x:
+                previous_x = x  # shifted by `world.Background.shift_unseen()`
+            placements.append((img, round(self.interpolate(previous_x, x) * self.scale), 0))
+        self.background_sprites.draw(placements)
 
     # bird
     def init_bird(self):
         """
-- Draws the bird image onto the canvas at the location 200, 200
+- Draws the bird image onto the canvas at the bird's spawnpoint
+  stored in `self.world` (200, 200)
 
 - `self.bird_canvas_image`: the bird's canvas image tag is stored in this
 
-Defines the properties required for the gravity effect on the bird:
-    - `self.bird_velocity = 0`
-    The current velocity of the bird (amount of pixels that the bird
-    is moved everytime `self.make_bird_fall()` is called)
-
-    - `self.terminal_velocity = 9.5`
-    Maximum downwards velocity that the bird can reach
-
-    - `self.gravity_acceleration = 0.6`
-    The amount of pixels `self.bird_velocity` increases by every
-    `self.gravity_interval` amount of milliseconds
-
-    - `self.gravity_interval = 15`
-    The amount of milliseconds after which the `self.make_brid_fall()`
-    recursively calls itself (discussed later)
-
-    - `self.bottom_death_limit = (self.game_window_height - 30)`
-    Defines the coordinates of the false 'ground' in the bottom of
-    the screen at which the bird should die if it reaches this
+The properties required for the gravity effect on the bird (velocity,
+terminal velocity, gravity acceleration, the ground limit) are now
+defined in `world.World.init_bird()`
 
 - Binds LEFT_CLICK and SPACEBAR to the `make_bird_hop()` method,
   which is basically the jump the bird makes when the user clicks
+- `self.autopilot`: a bot playing instead of the player, if it isn't `None`.
+  It is a function which gets `self.world` before every step and returns
+  `True` to hop (like the policies of `evaluate.py`), and it starts the
+  rounds by itself, see `self.new_game()` and `self.lose_game()` (used by
+  `python train.py watch`). Its rounds aren't saved as the player's
 
 Defines some properties used by the `idle_bird_animation()` method
     - Enables a continuous up and down motion when the round hasn't
@@ -194,106 +447,66 @@ Defines some properties used by the `idle_bird_animation()` method
         """
 
         bird_img = self.player_icon_image
-        self.bird_canvas_image = self.canvas.create_image(0, 0, image=bird_img)
-        self.canvas.moveto(self.bird_canvas_image, 200, 200)
+        self.bird_canvas_image = self.create_scaled_image(0, 0, bird_img)
+        self.drawn_bird_position = None
+        self.draw_bird()
 
-        self.bird_velocity = 0
-        self.terminal_velocity = 9.5  # maximum downwards velocity the bird can reach
-        self.gravity_acceleration = 0.6   # pixels per gravity_interval that will be added to the bird's velocity
-        self.gravity_interval = 15
-        self.bottom_death_limit = self.game_window_height - 30  # coords below which the bird dies, for ground death
+        self.pending_hop = False
+        self.autopilot = None
 
         self.bind("<Button-1>", lambda e: self.make_bird_hop())
         self.bind("<space>", lambda e: self.make_bird_hop())
         # left click and spacebar events binded to the game window
 
-        self.idle_interrupt = False
         self.idle_animation_active = True
         self.idle_pixel_count = 0
         self.idle_increment = 1
-        self.idle_bird_animation()
+        self.idle_speed = world.World.TICK_MS / 20  # the bird used to move 1 pixel every 20 milliseconds
+
+    def draw_bird(self):
+        """
+Moves `self.bird_canvas_image` to the bird's position in `self.world`
+(between the last 2 steps, see `self.interpolate()`, and scaled by
+`self.scale`), unless it is already drawn there (`self.drawn_bird_position`)
+        """
+
+        bird_y = self.interpolate(self.previous_bird_y, self.world.bird_y)
+        position = (round(self.world.bird_x * self.scale), round(bird_y * self.scale))
+        if position != self.drawn_bird_position:
+            self.canvas.moveto(self.bird_canvas_image, *position)
+            self.drawn_bird_position = position
 
     def idle_bird_animation(self):
         """
-- A recursive method that runs in its own thread,
-  running the idle animation of the bird when a round isn't going on
+- Runs one step of the idle animation of the bird, called by
+  `self.update_game()` on every step while `self.idle_animation_active`
+  is `True` (when a round isn't going on)
 
-- Makes the bird move up or down by 1 pixel on every
+- Makes the bird move up or down by `self.idle_speed` pixels on every
   call and stores the pixels moved till now
 
 - The way this animation works is, it keeps moving
   the bird up/down until it has been moved 30 pixels. Then it
   switches to the other direction and resets the pixel count
   to 0. Then counts till 30 again.
-
-- This recursion is stopped by making the `self.idle_interrupt`
-  boolean `True` while the thread is running
-
-- Runs every 20 milliseconds
         """
 
-        if self.idle_interrupt:
-            self.idle_interrupt = False
-            self.idle_animation_active = False
-            return
-
-        self.idle_animation_active = True
-        self.canvas.move(self.bird_canvas_image, 0, self.idle_increment)
-        self.idle_pixel_count += 1
+        self.world.bird_y += self.idle_increment * self.idle_speed
+        self.idle_pixel_count += self.idle_speed
 
         if self.idle_pixel_count > 30:
             self.idle_increment *= -1
             self.idle_pixel_count = 0
 
-        self.after(20, self.idle_bird_animation)
-
-    def make_bird_fall(self):
-        """
-- A recursive method that run its own thread while the boolean
-  `self.gravity_enabled` is `True`
-- If `self.gravity_enabled` is set to `False`, the thread stops
-  immediately
-
-The logic of the gravity is pretty simple. when this function is called:
-    - `self.bird_velocity` increases by `self.gravity_acceleration`
-      amount of pixels
-    - It is set to `self.terminal_velocity` in case it goes over
-      the defined terminal velocity
-    - Moves `self.bird_canvas_image` (the drawn bird image) in
-      the y-direction by `self.bird_velocity` pixels
-    - Calls itself after `self.gravity_interval` milliseconds
-      in a separate thread using tkinter's `self.after(ms, func)` method
-
-Basically, just like the real world, every moment the bird falls down
-slightly more than the previous instant
-    - At t=0ms, bird is at 200y, its velocity increases by 0.6 px
-    - At t=15ms, bird will be at 200y + velocity = 200.6y, velocity
-      increases by the same amount again and becomes 1.2px
-    - At t=30ms, bird will be at 200.6y + velocity = 201.8y,
-      velocity then becomes 1.2px + 0.6px = 1.8px
-    - At t=45ms, bird will now be at 201.8y + velocity = 203.6y and so on...
-
-- Runs every `self.gravity_interval` milliseconds
-        """
-
-        if not self.gravity_enabled:
-            return
-
-        self.bird_velocity += self.gravity_acceleration
-        self.bird_velocity = min(self.bird_velocity, self.terminal_velocity)
-
-        self.canvas.move(self.bird_canvas_image, 0, self.bird_velocity)
-        # moves the bird in y direction by the current velocity amount of pixels
-
-        self.after(self.gravity_interval, self.make_bird_fall)  # recursive call to continuously simulate gravity
-
     def make_bird_hop(self):
         """
 - This method is called whenever the user clicks on the screen
   or presses spacebar to make the bird jump/hop
-- The velocity is set to a fixed negative value -> -10.5
-- This means a constant upwards velocity is assigned to the bird,
-  leading to a "jump" effect since the gravity is still active
+- It doesn't change the bird's velocity itself, it sets
+  `self.pending_hop` to `True` and the hop is passed to
+  `self.world.step()` on the next step of the game loop
+    - this way every hop happens exactly at the start of a step,
+      no matter when the click event arrived
 - If `self.main_menu_screen` is `True`, this function will not run,
   since the bird should not hop while the main menu is active
         """
@@ -301,18 +514,20 @@ slightly more than the previous instant
         if self.main_menu_screen:
             return
 
-        self.bird_velocity = -10.5
-        # bird provided an upward velocity
+        self.pending_hop = True
 
     # main menu
     def init_mainmenu(self):
         """
-This method draws the widgets present in the main menu and
-stores their tags in class attributes:
+This method draws the widgets present in the main menu at their places
+in `self.MAINMENU_LAYOUT` and stores their tags in class attributes:
     - `self.play_button_canvas_image`: play button image
     - `self.exit_button_canvas_image`: exit button image
     - `self.highscore_canvas_label`: shows the current
-      highscore on the main menu
+      highscore on the main menu, updated by `self.update_highscore_label()`
+      once `self.backend` has read it from its file
+    - `self.leaderboard_canvas_label`: shows today's rounds from the
+      leaderboard, filled in by `self.show_mainmenu()`
     - `self.logo_canvas_image`: the logo of the game
 - Calls `init_help()` method which draws the help image
   on the canvas, which will show up on the pre round screen
@@ -320,22 +535,30 @@ stores their tags in class attributes:
   their respective methods `self.new_game()` and `self.exit_game()`
         """
 
-        self.play_button_canvas_image = self.canvas.create_image(
-            self.game_window_width/2, 310,
-            image=self.play_button_image
+        self.play_button_canvas_image = self.create_scaled_image(
+            *self.mainmenu_position("play_button"),
+            self.play_button_image
         )
-        self.exit_button_canvas_image = self.canvas.create_image(
-            self.game_window_width/2, 370,
-            image=self.exit_button_image
+        self.exit_button_canvas_image = self.create_scaled_image(
+            *self.mainmenu_position("exit_button"),
+            self.exit_button_image
         )
-        self.highscore_canvas_label = self.canvas.create_text(
-            self.game_window_width/2, 430,
-            text="Highscore: " + self.backend.get_current_highscore(),
-            font=("Calibri", 18, "bold")
+        self.highscore_canvas_label = self.create_scaled_text(
+            *self.mainmenu_position("highscore_label"),
+            ("Calibri", 18, "bold"),
+            text="Highscore: " + self.backend.get_current_highscore()
         )
-        self.logo_canvas_image = self.canvas.create_image(
-            self.game_window_width/2, 130,
-            image=self.logo_image
+        self.leaderboard_canvas_label = self.create_scaled_text(
+            *self.mainmenu_position("leaderboard_label"),
+            ("Calibri", 12, "bold"),
+            text=""
+        )
+        self.last_round_score = None
+        self.update_leaderboard_label()
+        self.backend.highscore_listeners.append(self.update_highscore_label)
+        self.logo_canvas_image = self.create_scaled_image(
+            *self.mainmenu_position("logo"),
+            self.logo_image
         )
 
         self.init_help()
@@ -343,6 +566,46 @@ stores their tags in class attributes:
         self.canvas.tag_bind(self.play_button_canvas_image, '<Button-1>', lambda e: self.new_game())
         self.canvas.tag_bind(self.exit_button_canvas_image, '<ButtonRelease-1>', lambda e: self.exit_game())
 
+    def mainmenu_position(self, widget):
+        """
+Returns the logical coordinates of the center of `widget`, see `self.MAINMENU_LAYOUT`
+        """
+
+        x, y = self.MAINMENU_LAYOUT[widget]
+        return self.game_window_width/2 + x, y
+
+    def update_highscore_label(self):
+        """
+Shows the current highscore of `self.backend` on `self.highscore_canvas_label`
+        """
+
+        self.canvas.itemconfigure(self.highscore_canvas_label, text="Highscore: " + self.backend.get_current_highscore())
+
+    def update_leaderboard_label(self):
+        """
+Shows on `self.leaderboard_canvas_label` how many rounds were played
+today, the best score of today and how the last round compares to all
+the rounds played
+    - the leaderboard of `self.backend` is read on its writer thread, the
+      label is changed once the result is delivered to the game loop
+        """
+
+        profile = self.backend.profile
+        last_round_score = self.last_round_score
+
+        def query(board):
+            percentile = None if last_round_score is None else board.percentile_of(last_round_score, profile=profile)
+            return board.day_summary(profile=profile), percentile
+
+        def show(result):
+            (rounds_today, best_today), percentile = result
+            leaderboard_text = f"Today: {rounds_today} rounds" + (f", best {best_today}" if rounds_today else "")
+            if percentile is not None:
+                leaderboard_text += f"  |  Last round beat {percentile:.0%} of your rounds"
+            self.canvas.itemconfigure(self.leaderboard_canvas_label, text=leaderboard_text)
+
+        self.backend.query_leaderboard(query, show)
+
     def hide_mainmenu(self):
         """
 Hides the drawn main-menu widgets which include:
@@ -355,6 +618,7 @@ Hides the drawn main-menu widgets which include:
         self.canvas.itemconfigure(self.play_button_canvas_image, state='hidden')
         self.canvas.itemconfigure(self.exit_button_canvas_image, state='hidden')
         self.canvas.itemconfigure(self.highscore_canvas_label, state='hidden')
+        self.canvas.itemconfigure(self.leaderboard_canvas_label, state='hidden')
         self.canvas.itemconfigure(self.logo_canvas_image, state='hidden')
 
     def show_mainmenu(self):
@@ -364,15 +628,20 @@ Hides the drawn main-menu widgets which include:
   canvas widgets which can changed
 - The widgets are also brought above all the background
   widgets to make them visible
+- The leaderboard label is updated with `self.update_leaderboard_label()`
         """
 
+        self.update_leaderboard_label()
+
         self.canvas.itemconfigure(self.play_button_canvas_image, state='normal')
         self.canvas.itemconfigure(self.exit_button_canvas_image, state='normal')
         self.canvas.itemconfigure(self.highscore_canvas_label, state='normal', text="Highscore: " + self.backend.get_current_highscore())
+        self.canvas.itemconfigure(self.leaderboard_canvas_label, state='normal')
         self.canvas.itemconfigure(self.logo_canvas_image, state='normal')
         self.canvas.lift(self.play_button_canvas_image)
         self.canvas.lift(self.exit_button_canvas_image)
         self.canvas.lift(self.highscore_canvas_label)
+        self.canvas.lift(self.leaderboard_canvas_label)
         self.canvas.lift(self.logo_canvas_image)
 
     # help
@@ -382,21 +651,28 @@ Hides the drawn main-menu widgets which include:
   be displayed on the pre round screen
 - Stores the image tag in `self.help_canvas_image` and
   makes it hidden by default
+- The image itself is only decoded by `self.show_help()`, since it isn't
+  needed until the first round, `self.help_image` is `None` until then
 - The help image indicates the user what can be used
   to play the game. In our case, left mouse click and spacebar
         """
 
-        self.help_canvas_image = self.canvas.create_image(
-            self.game_window_width/2, 420,
-            image=self.help_image, state='hidden'
+        self.help_image = None
+        self.help_canvas_image = self.create_scaled_image(
+            *self.mainmenu_position("help"),
+            self.help_image, state='hidden'
         )
 
     def show_help(self):
         """
 - Changes the `state` property of `self.help_canvas_image`
   to `'normal'` to show the widget, which was previously hidden
+- The first time, the help image is decoded and given to the widget
         """
 
+        if self.help_image is None:
+            self.help_image = self.backend.get_help_image()
+            self.set_scaled_image(self.help_canvas_image, self.help_image)
         self.canvas.itemconfigure(self.help_canvas_image, state='normal')
 
     def hide_help(self):
@@ -413,200 +689,364 @@ Hides the drawn main-menu widgets which include:
 - Draws the text widget displaying the current score at the top of
   the window
 - Stores its tag in `self.scoreboard`
-- It displays the current value of `self.current_score` variable,
+- It displays the current score of `self.world`,
   which is by default 0 on the opening of the game
+- `self.displayed_score` stores the score the scoreboard is currently showing
         """
 
-        self.scoreboard = self.canvas.create_text(300, 30, text=f"{self.current_score}", font=("Calibri", 48, "bold"), state='hidden')
+        self.displayed_score = self.world.current_score
+        self.scoreboard = self.create_scaled_text(300, 30, ("Calibri", 48, "bold"), text=f"{self.displayed_score}", state='hidden')
 
     def update_scoreboard(self):
         """
-- Changes the text of `self.scoreboard` to the current value
-  of `self.current_score`
+- Changes the text of `self.scoreboard` to the current score of
+  `self.world`, only if it changed since the last update
         """
 
-        self.canvas.itemconfigure(self.scoreboard, text=f'{self.current_score}')
-
-    def increment_score(self):
-        """
-- Increases the `self.current_score` by 1 and calls `self.update_scoreboard()`
-        """
+        if self.displayed_score == self.world.current_score:
+            return
 
-        self.current_score += 1
-        self.update_scoreboard()
+        self.displayed_score = self.world.current_score
+        self.canvas.itemconfigure(self.scoreboard, text=f'{self.displayed_score}')
 
     def reset_score(self):
         """
-- Sets `self.current_score` to 0 and calls `self.update_scoreboard()`
+- Sets the score of `self.world` to 0 and calls `self.update_scoreboard()`
         """
 
-        self.current_score = 0
+        self.world.reset_score()
         self.update_scoreboard()
 
     def init_pillars(self):
         """
-Defines some properties related to the obstacles/pillars:
-    - `self.pillar_spawnpoint_x`: x coordinate of the first
-      off-screen pillar in a new round
-    - `self.pillar_distance`: distance between 2 pillars' top
-      left corners
-    - `self.pillar_height`: height of the pillar (also the
-      image file's height)
-    - `self.pillar_hole_gap`: height of the gap between the
-      top and bottom edges of 2 pillars through which the
-      bird will pass
-    - `self.STANDARD_PILLAR_UP_Y`: the default y coordinate
-      of the upper pillar, making the pillar hole gap lie exactly in the center of the game window
-    - `self.STANDARD_PILLAR_DOWN_Y`: the default y coordinate
-      of the lower pillar, making the pillar hole gap lie exactly in the center of the game window
-
-3 pairs of upper and lower pillars are spawned
-    - These pairs are shifted to their positions by calling
-      `self.reset_pillars_to_initial_position()`, discussed below
+The properties related to the obstacles/pillars (spawnpoint, distance
+between them, hole gap, etc) are defined in `world.World.init_pillars()`
+
+One pair of upper and lower pillars is drawn for every pair in the pool
+of `self.world` (3 for the default window, see `world.World.update_pillar_pool()`)
     - Each pair of the pillars' tags are stored together in
       `self.canvas_pillar_images` as a tuple like `[(7,8), (9,10), (10,11)]`
-    - Note: `self.canvas_pillar_images` stores each pair of
-      pillars as 1 element in the form of a tuple and I
-      mentioned this again for no reason. Anyways.
-        """
-
-        self.pillar_spawnpoint_x = self.game_window_width + 100  # x coord of the first off-screen pillar in a new round
-        self.pillar_distance = 300  # distance between 2 pillars' top left corners
-        self.pillar_height = 400  # height of a pillar (image file)
-        self.pillar_hole_gap = 170  # distance between bottom edge of top pillar and top edge of bottom pillar
+    - The n-th pair in `self.canvas_pillar_images` is always drawn at
+      the position of the n-th pair in `self.world.initial_pillar_positions`
+    - These pairs are shifted to their positions by calling
+      `self.reset_pillars_to_initial_position()`
 
-        self.STANDARD_PILLAR_UP_Y = (self.game_window_height - self.pillar_hole_gap)/2 - self.pillar_height
-        self.STANDARD_PILLAR_DOWN_Y = self.STANDARD_PILLAR_UP_Y + self.pillar_height + self.pillar_hole_gap
-        # standard position of both the pillars, making the hole lie exactly in the center of the window height
+- `self.pillar_sprites`: a `sprites.SpriteGroup` which draws all the pillars,
+  moving the visible ones with a single canvas call and skipping the
+  ones that are off the screen
+        """
 
-        for i in range(3):
-            pillar_up = self.canvas.create_image(0, 0, image=self.pillar_up_image)
-            pillar_down = self.canvas.create_image(0, 0, image=self.pillar_down_image)
+        self.pillar_sprites = sprites.SpriteGroup(self.canvas, "pillar", self.game_window_width, self.game_window_height)
+        for i in range(len(self.world.initial_pillar_positions)):
+            pillar_up = self.create_scaled_image(0, 0, self.pillar_up_image)
+            pillar_down = self.create_scaled_image(0, 0, self.pillar_down_image)
 
             self.canvas_pillar_images.append((pillar_up, pillar_down))
+            self.pillar_sprites.add(pillar_up, self.pillar_up_image.width(), self.pillar_up_image.height())
+            self.pillar_sprites.add(pillar_down, self.pillar_down_image.width(), self.pillar_down_image.height())
 
         self.reset_pillars_to_initial_position()
 
     def reset_pillars_to_initial_position(self):
         """
 - When a new round is about to start, this method resets
-  the position of the pair of pillars to their initial positions
-- Starting from the `self.pillar_spawnpoint_x` coordinate,
-  these pairs are separated by `self.pillar_distance` pixels of distance
-
-A random value from -100 to 100 in the factor of 10
-(-100, -90, ... 90, 100) is added to their y-coordinate
-    - This ensures randomness in the heights of hole
-      gaps and makes the game challenging
+  the position of the pairs of pillars in `self.world` and draws them
         """
 
-        for i, [pillar_up, pillar_down] in enumerate(self.canvas_pillar_images):
-            random_shift = random.randint(-10, 10) * 10
+        self.world.reset_pillars_to_initial_position()
+        self.save_previous_state()
+        self.draw_pillars()
 
-            self.canvas.moveto(
-                pillar_up,
-                self.pillar_spawnpoint_x + (self.pillar_distance * i),
-                self.STANDARD_PILLAR_UP_Y + random_shift
-            )
-            self.canvas.moveto(
-                pillar_down,
-                self.pillar_spawnpoint_x + (self.pillar_distance * i),
-                self.STANDARD_PILLAR_DOWN_Y + random_shift
-            )
+    def draw_pillars(self):
+        """
+Moves every pair of pillars in `self.canvas_pillar_images` to the
+position of its pair in `self.world.initial_pillar_positions` (between
+the last 2 steps, see `self.interpolate()`, and scaled by `self.scale`),
+through `self.pillar_sprites`
+    - a pair that was just shifted to the right is drawn at its new position
+        """
 
-        self.initial_pillar_positions = self.canvas_pillar_images.copy()
-        self.currently_tracking_index = 0
+        scale = self.scale
+        placements = []
+        for [pillar_up, pillar_down], [x, random_shift], previous_x in zip(
+            self.canvas_pillar_images, self.world.initial_pillar_positions, self.previous_pillar_positions
+        ):
+            if previous_x < x:
+                previous_x = x  # shifted by `world.World.shift_unseen_pillar()`
+            x = round(self.interpolate(previous_x, x) * scale)
+            placements.append((pillar_up, x, round((self.world.STANDARD_PILLAR_UP_Y + random_shift) * scale)))
+            placements.append((pillar_down, x, round((self.world.STANDARD_PILLAR_DOWN_Y + random_shift) * scale)))
+        self.pillar_sprites.draw(placements)
 
-    def shift_unseen_pillar(self):
+    def step_round(self):
         """
-Similar to `shift_unseen_background()`
-    - It shifts the first pillar to `self.pillar_spawnpoint_x`
-      and randomises the height again
-    - This gives an illusion of infinitely spawning pillars
-- The shift is also done to the `self.canvas_pillar_images`
-  list where the first element is appended at the last
-- Called by `self.keep_shifting_pillars()` whenever the
-  first pillar goes off screen
+- Called by `self.update_game()` on every step while
+  `self.round_running` is `True`
+- `self.world.step()` simulates one step of the round, with the
+  hop requested by the player (if any) since the last step, or by
+  `self.autopilot` if it plays
+- Every hop is also recorded by `self.recorder`
+- If the player lost, `self.lose_game()` is called
         """
 
-        first_pillar_up, first_pillar_down = self.canvas_pillar_images[0]
+        if self.autopilot is not None and self.autopilot(self.world):
+            self.pending_hop = True
+        hop, self.pending_hop = self.pending_hop, False
+        if hop:
+            self.recorder.record_hop(self.world.frame)
 
-        random_shift = random.randint(-10, 10) * 10
+        if self.world.step(hop):
+            self.lose_game()
 
-        self.canvas.moveto(first_pillar_up, self.pillar_spawnpoint_x, self.STANDARD_PILLAR_UP_Y + random_shift)
-        self.canvas.moveto(first_pillar_down, self.pillar_spawnpoint_x, self.STANDARD_PILLAR_DOWN_Y + random_shift)
+    # game loop
+    def init_game_loop(self):
+        """
+Defines the properties of the game loop and starts it:
+    - `self.frame_interval`: milliseconds between 2 frames, from `self.target_fps`
+    - `self.max_steps_per_frame`: the maximum amount of steps simulated
+      before a frame is drawn, enough to catch up on 250 milliseconds. A
+      late frame (a busy computer, or a display slower than `target_fps`)
+      is caught up on instead of slowing the game down, only longer
+      freezes (like dragging the window) are skipped
+    - `self.step_accumulator`: milliseconds of game time that haven't been
+      simulated yet
+    - `self.last_frame_time`: time (in seconds) when the last frame started
+        """
+
+        self.frame_interval = 1000 / self.target_fps
+        self.max_steps_per_frame = math.ceil(250 / world.World.TICK_MS)
+        self.step_accumulator = 0
+        self.last_frame_time = time.perf_counter()
+        self.game_loop()
+
+    def game_loop(self):
+        """
+- The only recursive method of the game, which runs everything:
+  the background, the idle animation of the bird and the rounds
+- It replaces the 5 separate threads (`self.after` loops with different
+  intervals) the game used to have, which drifted apart from each other
+
+It uses a fixed timestep:
+    - the time passed since the last frame is added to `self.step_accumulator`
+    - `self.update_game()` is called once for every `world.World.TICK_MS`
+      milliseconds in the accumulator, so the game runs at the same speed
+      no matter how often this method is called
+    - so the bird and the pillars move just as fast at 30, 60 or 144 FPS,
+      or when `self.after()` calls this late, and the round is exactly the
+      one a `world.World` stepped without a window would play
+    - if the game falls more than `self.max_steps_per_frame` steps behind,
+      the rest of the time is dropped, so it pauses instead of running
+      hundreds of steps at once after a freeze
+    - `self.render()` draws a frame on every call, even when no step was
+      due, with `self.interpolation` set to the part of a step left in the
+      accumulator. The frames are drawn between the last 2 steps, so the
+      motion stays smooth at any frame rate (like 144 FPS on a 144 Hz
+      display, see `main()`) while the steps keep their fixed rate
+
+- The results of the disk work done by `self.backend` on its writer thread
+  are handed to their callbacks here, on the tkinter thread
+- The time each part takes is recorded in `self.performance_stats`,
+  for the performance HUD
+- Calls itself again after whatever is left of `self.frame_interval`
+        """
+
+        frame_start = time.perf_counter()
+        self.backend.writer.deliver_completed()
+        self.step_accumulator += (frame_start - self.last_frame_time) * 1000
+        self.last_frame_time = frame_start
+
+        steps = 0
+        while self.step_accumulator >= world.World.TICK_MS and steps < self.max_steps_per_frame:
+            self.update_game()
+            self.step_accumulator -= world.World.TICK_MS
+            steps += 1
+
+        if self.step_accumulator >= world.World.TICK_MS:
+            self.step_accumulator = 0  # too far behind, skip the time we can't catch up on
+        self.interpolation = self.step_accumulator / world.World.TICK_MS
+
+        self.performance_stats.start_frame()
+        self.render()
+        self.performance_stats.record("game_loop", frame_start)
+
+        if self.hud_visible and frame_start - self.hud_last_update >= self.hud_update_interval:
+            self.update_performance_hud()
+            self.hud_last_update = frame_start
+
+        frame_time = (time.perf_counter() - frame_start) * 1000
+        self.after(max(1, int(self.frame_interval - frame_time)), self.game_loop)
+
+    def update_game(self):
+        """
+Simulates one step (`world.World.TICK_MS` milliseconds) of the game
+    - the positions before the step are saved, `self.save_previous_state()`
+    - the background scrolls, `self.scroll_background()`
+    - the idle animation of the bird runs, if it is active
+    - the round is stepped, if it is running
+        """
+
+        self.save_previous_state()
+        self.scroll_background()
+
+        if self.idle_animation_active:
+            start = time.perf_counter()
+            self.idle_bird_animation()
+            self.performance_stats.record("idle_bird_animation", start)
 
-        temp = self.canvas_pillar_images.pop(0)
-        self.canvas_pillar_images.append(temp)
+        if self.round_running:
+            start = time.perf_counter()
+            self.step_round()
+            self.performance_stats.record("step_round", start)
 
-    def keep_moving_pillars(self):
+    def save_previous_state(self):
         """
-- Recursive method that runs in its own thread
-- If `self.main_menu_screen` is `True`, this function
-  will not run, since the obstacles should not move while
-  the main menu is active
-- When called, it moves all the pairs of pillars
-  towards the left by 3 pixels
-- Runs every 10 milliseconds
+Saves the positions of everything that moves before a step, which the
+frames are drawn from together with the positions after it
+    - `self.previous_bird_y`
+    - `self.previous_pillar_positions`: x coordinate of every pair of pillars
+    - `self.previous_background_positions`: x coordinate of every background image
+Also called whenever something is moved back to its start, so it is drawn there right away
         """
 
-        if self.main_menu_screen:
-            return
+        self.previous_bird_y = self.world.bird_y
+        self.previous_pillar_positions = [pillar[0] for pillar in self.world.initial_pillar_positions]
+        self.previous_background_positions = list(self.background.positions)
 
-        for pillar_up, pillar_down in self.canvas_pillar_images:
-            self.canvas.move(pillar_up, -3, 0)
-            self.canvas.move(pillar_down, -3, 0)
+    def interpolate(self, previous, current):
+        """
+Returns the position `self.interpolation` of the way from `previous` (the
+position before the last step) to `current`
+        """
 
-        self.after(10, self.keep_moving_pillars)
+        return previous + (current - previous) * self.interpolation
 
-    def keep_shifting_pillars(self):
+    def render(self):
         """
-- Recursive function that runs in its own thread
-- If `self.main_menu_screen` is `True`, this function
-  will not run, since the obstacles should not be shifted
-  at all while the main menu is active
+Draws the game onto the canvas, between the states before and after the
+last step: the background, the bird, the pillars (only while a round is
+running) and the scoreboard
+        """
+
+        start = time.perf_counter()
+        self.draw_background()
+        self.performance_stats.record("draw_background", start)
 
-It checks whether the first pillar has gone off-screen or not
-    - If it has, it calls `self.shift_unseen_pillar()` to
-      shift the first pillar to the right end of the queue
-      both visually and the `self.canvas_pillar_images` list,
-      as explained before
+        start = time.perf_counter()
+        self.draw_bird()
+        self.performance_stats.record("draw_bird", start)
 
-- This method basically keeps shifting the pillars as soon
-  as the first pillar goes out of vision to give an illusion
-  of infinitely spawning pillars
-- Since it uses the same 3 pillars drawn at the start of the
-  program, there is no need for the canvas to keep drawing
-  and deleting pillar images
-- Runs every 50 milliseconds
+        if self.round_running:
+            start = time.perf_counter()
+            self.draw_pillars()
+            self.update_scoreboard()
+            self.performance_stats.record("draw_pillars", start)
+
+    # performance hud
+    def init_performance_hud(self):
         """
+Draws the performance HUD, an overlay in the top left corner of the
+canvas which is hidden by default and toggled with the F3 key. It shows:
+    - the current FPS and the median (p50) and 99th percentile (p99)
+      of the time between frames
+    - the amount of `self.after` callbacks currently scheduled
+    - the canvas calls made by the last drawing of the background and pillars
+    - the average time each part of the game loop takes
+    - a histogram of the frame times, where the red line is the
+      frame time needed to reach `self.target_fps`
 
-        if self.main_menu_screen:
-            return
+- `self.performance_stats`: a `performance.PerformanceStats` object which
+  keeps the measurements of the last frames in ring buffers
+- The HUD is only redrawn every `self.hud_update_interval` seconds, so
+  it barely slows down the game itself
+        """
+
+        self.performance_stats = performance.PerformanceStats()
+        self.hud_visible = False
+        self.hud_update_interval = 0.25
+        self.hud_last_update = 0
 
-        last_pillar_up, last_pillar_down = self.canvas_pillar_images[-1]
-        xcoord_up, _ = self.canvas.coords(last_pillar_up)
+        self.hud_bins = 25
+        self.hud_bin_width = 2  # milliseconds of frame time per bar of the histogram
+        self.hud_histogram_height = 40
+        hud_bottom = 205
 
-        if self.pillar_spawnpoint_x - xcoord_up >= self.pillar_distance - 50:
-            # if the first pillar goes out of visual range
-            # print("shifted", self.canvas_pillar_images)
-            self.shift_unseen_pillar()
+        self.hud_background = self.canvas.create_rectangle(5, 5, 255, hud_bottom + 5, fill="black", outline="", state='hidden')
+        self.hud_text = self.canvas.create_text(
+            10, 10, anchor=tk.NW, fill="white", font=("Consolas", 9), state='hidden'
+        )
+        self.hud_bars = [
+            self.canvas.create_rectangle(10 + i*9, hud_bottom, 17 + i*9, hud_bottom, fill="lime", outline="", state='hidden')
+            for i in range(self.hud_bins)
+        ]
+        budget_x = 10 + 9 * (1000 / self.target_fps) / self.hud_bin_width
+        self.hud_budget_line = self.canvas.create_line(
+            budget_x, hud_bottom - self.hud_histogram_height, budget_x, hud_bottom, fill="red", state='hidden'
+        )
+        self.hud_items = [self.hud_background, self.hud_text, *self.hud_bars, self.hud_budget_line]
+
+        self.bind("<F3>", lambda e: self.toggle_performance_hud())
+
+    def toggle_performance_hud(self):
+        """
+Shows the performance HUD if it is hidden and hides it if it is visible
+        """
+
+        self.hud_visible = not self.hud_visible
+        state = 'normal' if self.hud_visible else 'hidden'
+        for item in self.hud_items:
+            self.canvas.itemconfigure(item, state=state)
+            self.canvas.lift(item)
 
-        self.after(50, self.keep_shifting_pillars)
+        if self.hud_visible:
+            self.update_performance_hud()
+
+    def update_performance_hud(self):
+        """
+Redraws the text and the histogram of the performance HUD with the
+current values in `self.performance_stats`
+        """
+
+        stats = self.performance_stats
+        scheduled_callbacks = len(self.tk.splitlist(self.tk.call("after", "info")))
+        lines = [
+            f"FPS {stats.fps():5.1f}",
+            f"frame p50 {stats.frame_time_percentile(0.5):5.2f} ms  p99 {stats.frame_time_percentile(0.99):5.2f} ms",
+            f"scheduled after callbacks: {scheduled_callbacks}",
+            f"canvas calls (background + pillars): {self.background_sprites.calls + self.pillar_sprites.calls}",
+        ]
+        for name, average in stats.section_averages().items():
+            lines.append(f"{name:<20} {average:6.3f} ms")
+        self.canvas.itemconfigure(self.hud_text, text="\n".join(lines))
+
+        counts = stats.histogram(self.hud_bins, self.hud_bin_width)
+        highest = max(counts) or 1
+        for bar, count in zip(self.hud_bars, counts):
+            x1, _, x2, y2 = self.canvas.coords(bar)
+            self.canvas.coords(bar, x1, y2 - self.hud_histogram_height * count / highest, x2, y2)
 
     def lose_game(self):
         """
 - This method is called when the player loses due to
   collision of the bird with the ground, off screen
   pillar or the on screen pillar
-- `self.main_menu_screen` is set to `True`
+- `self.main_menu_screen` is set to `True` and `self.round_running`
+  to `False`, which stops the round in the game loop
+- The pillars and the scoreboard are drawn one last time, at the
+  positions of the step the bird died in
 
 These methods are called:
-    - `self.disable_gravity()`: switch off gravity on the bird
-    - `self.backend.update_highscore_in_file(self.current_score)`: update highscore
+    - `self.backend.update_highscore_in_file(self.world.current_score)`: update highscore
       in the highscore text file, if applicable
+    - `self.backend.save_replay()`: saves the replay of the round as `last_round.bfr`,
+      and also as `highscore.bfr` if the highscore was beaten
+    - `self.backend.add_round_to_leaderboard()`: stores the score, seed,
+      duration and replay of the round in the leaderboard
     - `self.show_mainmenu()`: shows main menu
 
+A round played by `self.autopilot` isn't the player's, so none of the
+3 first methods are called for it (nothing is saved), and the next round
+is started by itself with `self.new_autopilot_game()`
+
 - The `self.scoreboard` canvas image is brought in front of
   all the other widgets
 - Left click and spacebar events get disabled to disallow
@@ -615,8 +1055,22 @@ These methods are called:
 
         # print("lose game")
         self.main_menu_screen = True
-        self.disable_gravity()
-        self.backend.update_highscore_in_file(self.current_score)
+        self.round_running = False
+        self.save_previous_state()  # the last frame shows the bird where it died, not between 2 steps
+        self.draw_pillars()
+        self.update_scoreboard()
+
+        if self.autopilot is None:
+            replay_data = self.recorder.finish(self.world)
+            self.backend.save_replay(replay_data, "last_round.bfr")
+            if self.backend.update_highscore_in_file(self.world.current_score):
+                self.backend.save_replay(replay_data, "highscore.bfr")
+            self.backend.add_round_to_leaderboard(
+                self.world.current_score, self.world.seed, self.world.frame * world.World.TICK_MS, replay_data
+            )
+        else:
+            self.after(1500, self.new_autopilot_game)
+        self.last_round_score = self.world.current_score
         self.after(500, self.show_mainmenu)
         self.canvas.lift(self.scoreboard)
         self.bind("<Button-1>", lambda e: print(end=""))
@@ -635,7 +1089,9 @@ These methods are called:
     - `self.reset_score()`: set the score to 0
     - `self.reset_pillars_to_initial_position()`: reset the obstacles for a new round
     - `self.show_help()`: shows the image widget indicating the controls of the game, since this is pre-round
-    - `self.idle_bird_animation()`: starts the idle bird animation
+
+- The idle bird animation is started again, if it was stopped
+- With `self.autopilot`, the round starts by itself after a second
 
 The left click and spacebar events are binded to `self.start_game()`
     - `self.bird_canvas_image` which is the drawn bird image, is moved to its initial position (200, 200)
@@ -650,8 +1106,28 @@ The left click and spacebar events are binded to `self.start_game()`
         self.show_help()
         self.after(50, lambda: [self.bind("<Button-1>", lambda e: self.start_game()), self.bind("<space>", lambda e: self.start_game())])
         if not self.idle_animation_active:
-            self.canvas.moveto(self.bird_canvas_image, 200, 200)
-            self.idle_bird_animation()
+            self.world.reset_bird()
+            self.save_previous_state()  # so the bird doesn't slide back to its spawnpoint
+            self.idle_animation_active = True
+        if self.autopilot is not None:
+            self.after(1000, self.start_autopilot_round)
+
+    def new_autopilot_game(self):
+        """
+Goes from the main menu to the pre round screen of the next round of
+`self.autopilot`, unless the player already left the main menu
+        """
+
+        if self.autopilot is not None and self.main_menu_screen:
+            self.new_game()
+
+    def start_autopilot_round(self):
+        """
+Starts the round for `self.autopilot`, unless the player already started it
+        """
+
+        if self.autopilot is not None and not self.round_running and not self.main_menu_screen:
+            self.start_game()
 
     def start_game(self):
         """
@@ -660,35 +1136,35 @@ The left click and spacebar events are binded to `self.start_game()`
 
 These things happen here:
     - The help image is hidden
-    - Switch on the gravity on the bird
-    - Start moving the obstacles/pillars
-    - Start the infinite obstacle effect
-    - A recursive method that will be discussed later,
-      checks if the bird collided anywhere
+    - `self.round_running` is set to `True`, so the game loop starts
+      running the gravity, the pillars and the collision checks of the round
+    - `self.recorder`: a `replay.Recorder` that records the seed and
+      the hops of the round, so it can be replayed later
     - Since the left click and space bar events aren't
       binded to the bird_hop function yet, the trigger won't
       make the bird jump. Therefore this function is called
       manually to give the initial jump to the bird.
 
 - Left click and keyboard events are again binded to `self.make_bird_hop()`
-- `self.idle_interrupt` is set to `True` since the bird's
-  idle animation is active during the pre round, which
-  stops the `self.idle_bird_animation()` recursive thread
+- `self.idle_animation_active` is set to `False` since the bird's
+  idle animation is active during the pre round
         """
 
         # print("started")
         self.hide_help()
-        self.enable_gravity()
-        self.keep_moving_pillars()
-        self.keep_shifting_pillars()
-        self.keep_checking_if_player_lost()
+        self.recorder = replay.Recorder(self.world)
         self.make_bird_hop()
+        self.round_running = True
         self.bind("<Button-1>", lambda e: self.make_bird_hop())
         self.bind("<space>", lambda e: self.make_bird_hop())
-        self.idle_interrupt = True
+        self.idle_animation_active = False
 
     def exit_game(self):
         """
+- Called by the EXIT button and when the window is closed
+- `self.backend.close()` writes the highscore into its file and waits until
+  everything else (replays, leaderboard) is written too
+
 the scoreboard widget is deleted manually
     - This has been done to avoid a weird tkinter `alloc` error
 
@@ -696,129 +1172,44 @@ the scoreboard widget is deleted manually
 
         """
 
+        self.backend.close()
         self.canvas.delete(self.scoreboard)  # done to avoid a weird tkinter error when destroying game window
         self.after(200, self.destroy)
 
-    def check_pillar_for_score(self):
-        """
-- Checks if the bird has crossed a pillar
-
-If it has, it will now check whether the bird is currently
-flying higher than the game window
-    If it is flying higher, this means the bird
-    should collide with the offscreen upper pillar
-         - Therefore it returns `True` (this will be used
-           in `self.keep_checking_if_player_lost()`, discussed below)
-    - Else, call `self.increment_scoreboard()` to increase the score
-        """
-
-        currently_tracking_pillars = self.initial_pillar_positions[self.currently_tracking_index]
-        currently_tracking_pillar_up = currently_tracking_pillars[0]
-
-        bird_coord_x, bird_coord_y = self.canvas.coords(self.bird_canvas_image)
-        pilup_coord_x = self.canvas.coords(currently_tracking_pillar_up)[0]
-
-        if pilup_coord_x < bird_coord_x:
-            if bird_coord_y < 0:
-                self.lose_game()
-                return True
-
-            self.increment_score()
-            self.currently_tracking_index += 1
-            self.currently_tracking_index %= len(self.initial_pillar_positions)
-
-    def keep_checking_if_player_lost(self):
-        """
-- This is a recursive method that run in its own thread
-
-It has two purposes:
-    - Check if player lost
-    - Increase score if player passed a pillar
-
-It first calls `self.check_pillar_for_score()` and keeps track of its return value in a local variable
-    - If it returns `True` this means the player collided with an off screen pillar
-    - Therefore, `self.lose_game()` is called and the thread ends here
-    - Otherwise, nothing happens
-
-Next, to see if the bird collided with any pillar, a method `find_overlapping(*args)` of class `tk.Canvas` is utilised
-    - The coordinates of the top-left corner (x1, y1) and the bottom-right corner (x2, y2) of the rectangle
-      surrounding the `self.bird_canvas_image` are stored
-
-    - Using these coordinates, the coordinates of 2 smaller rectangles that
-      cover the bird's visual body and beak are derived, for accurate deaths
-      due to collision. This is done so that the bird doesn't die due to
-      invisible collisions (where the bird doesn't touch the obstacle visually,
-      but its rectangle does)
-
-      ```
-      rectangle_of_body = (x1+7, y1, x2-16, y2-1)  # 32x42 rectangle
-      rectangle_of_beak = (x1+7+32, y1+18, x2, y2-1)  # 16x24 rectangle
-      ```
-
-    - The `tk.Canvas.find_overlapping(*args)` method returns a list of all the tags of the widgets
-      that are currently coinciding with the passed rectangle coordinates
-      (in this case, the rectangles we made)
 
-
-    - In our case, the background images are always overlapping with the bird visually, so they should be ignored
-
-    - The way I implemented this is:
-      - If the sum of the tags (which are unique integers) is greater than 10,
-        this implies the bird collided with any of the pillars, therefore `self.lose_game()`
-        is called and the thread ends here
-      - Otherwise, the bird is safe
-
-    - The reason this works is that firstly, I noticed that the tags of
-      the background images are always 2, 3 and 4 and the pillars go from 7 to 12.
-
-    When the bird isn't colliding with the pillars, the possible list values returned are:
-        - `[1, 2], [1, 3], [1, 4]` or sometimes rarely `[1, 2, 3], [1, 3, 4], [1, 4, 2]`
-        - Notice, the sums of all these lists is always less than 10
-        - Since the pillars' tags go from 7 to 12, if any one of them gets added to the returned list, the sum always exceeds 10
-
-- This method runs every 10 milliseconds. Due to its superfast interval, I had to find a way which won't take up too much time or processing to see whether the bird collided with any pillars. This is why I adopted the easy `sum(tags_list) > 10` approach. Quick and efficient.
-        """
-
-        above_upper_limit = self.check_pillar_for_score()
-        if above_upper_limit is True:
-            self.lose_game()
-            return
-
-        x1, y1, x2, y2 = self.canvas.bbox(self.bird_canvas_image)  # main rectangle containing the entire bird image
-        rectangle_of_body = (x1+7, y1, x2-16, y2-1)  # 32x42 rectangle
-        rectangle_of_beak = (x1+7+32, y1+18, x2, y2-1)  # 16x24 rectangle
-
-        overlapping_objects_with_body = self.canvas.find_overlapping(*rectangle_of_body)
-        overlapping_objects_with_beak = self.canvas.find_overlapping(*rectangle_of_beak)
-
-        if sum(set(overlapping_objects_with_body + overlapping_objects_with_beak)) > 10:
-            self.lose_game()
-            return
-
-        _, y_coords = self.canvas.coords(self.bird_canvas_image)
-        if y_coords >= self.bottom_death_limit:
-            self.lose_game()
-            return
-
-        self.after(10, self.keep_checking_if_player_lost)
-
-    def disable_gravity(self):
-        """
-- `self.gravity_enabled` is set to `False`
-- This automatically stops the `self.make_bird_fall()` recursive thread if it's running currently
-        """
-
-        self.gravity_enabled = False
-
-    def enable_gravity(self):
-        """
-- `self.gravity_enabled` is set to `True`
-- `self.make_bird_fall()` is called, which starts a new thread controlling the bird's gravity
-        """
-
-        self.gravity_enabled = True
-        self.make_bird_fall()
+def main():
+    """
+Starts the game, with these command line options:
+    - `--fps N`: frames drawn per second (60 by default), set it to the
+      refresh rate of a faster display for a smoother game. The game itself
+      always runs at the same speed, see `App.game_loop()`. It must be at least 1
+    - `--profile-startup`: prints how long each phase of the startup took,
+      the slowest first (see `performance.StartupProfiler`)
+    - `--profile-output FILE`: also runs `cProfile` from here until the
+      first iteration of `mainloop()` and saves it into `FILE` (read it with
+      `python -m pstats FILE`), and the report into `FILE.txt`, since the
+      windowed executable has no console to print it in
+    """
+    if len(sys.argv) > 1:  # importing argparse takes about as long as drawing the first frame
+        with performance.startup.phase("parse arguments"):
+            import argparse
+
+            parser = argparse.ArgumentParser(description="Blappy Fird")
+            parser.add_argument("--profile-startup", action="store_true", help="print how long each phase of the startup takes")
+            parser.add_argument("--profile-output", metavar="FILE", help="also save a cProfile of the startup into FILE")
+            parser.add_argument("--fps", type=int, default=60, help="frames drawn per second, like the refresh rate of the display (default: %(default)s)")
+            arguments = parser.parse_args()
+            if arguments.fps < 1:
+                parser.error("--fps must be at least 1")
+
+        if arguments.profile_startup or arguments.profile_output:
+            performance.startup.print_report = True
+        if arguments.profile_output:
+            performance.startup.start_cprofile(arguments.profile_output)
+        App(target_fps=arguments.fps)
+    else:
+        App()
 
 
 if __name__ == '__main__':
-    App()
+    main()
@@ -9,11 +9,9 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[
-    	('assets\\pillars\\1_pillar_down.png', '.\\assets\\pillars'),
-    	('assets\\pillars\\1_pillar_up.png', '.\\assets\\pillars'),
-    	('assets\\birds\\1_bird.png', '.\\assets\\birds'),
-    	('assets\\bg\\1_skybg.png', '.\\assets\\bg'),
-    	('assets\\*.png', '.\\assets')
+    	# all the images are packed into the atlas, run `python atlas.py` before bundling
+    	('assets\\atlas.png', '.\\assets'),
+    	('assets\\atlas.json', '.\\assets')
 #    	('assets\play.png', 'assets'),
 #    	('assets\help.png', 'assets'),
 #    	('assets\logo.png', 'assets')
@@ -0,0 +1,204 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PerformanceStats:
+    """
+    This class collects how long the frames of the game and the parts of
+    the game loop take, for the performance HUD of `App` (toggled with F3).
+
+    Every measurement is appended to a ring buffer (a `deque` with a
+    `maxlen`), so only the last `size` values of everything are kept and
+    recording one costs about as much as appending to a list.
+    """
+
+    def __init__(self, size=240):
+        """
+- `size`: amount of values kept per ring buffer (240 frames is 4 seconds at 60 FPS)
+- `self.frame_intervals`: milliseconds between the starts of 2 frames
+- `self.sections`: dict of name: ring buffer of milliseconds that part took
+        """
+        self.size = size
+        self.frame_intervals = deque(maxlen=size)
+        self.sections = {}
+        self.last_frame_start = None
+
+    def start_frame(self):
+        """
+Called at the start of every frame, stores the time since the last one
+        """
+        now = time.perf_counter()
+        if self.last_frame_start is not None:
+            self.frame_intervals.append((now - self.last_frame_start) * 1000)
+        self.last_frame_start = now
+
+    def record(self, name, start):
+        """
+Stores the milliseconds since `start` (a `time.perf_counter()` value) as
+one measurement of the part of the game loop called `name`
+        """
+        elapsed = (time.perf_counter() - start) * 1000
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = deque(maxlen=self.size)
+        section.append(elapsed)
+
+    def fps(self):
+        """
+Returns the average frames per second over the stored frames
+        """
+        if not self.frame_intervals:
+            return 0
+        return 1000 * len(self.frame_intervals) / sum(self.frame_intervals)
+
+    def frame_time_percentile(self, fraction):
+        """
+Returns the frame time (milliseconds between 2 frames) at `fraction`
+(0.5 for the median, 0.99 for the 99th percentile)
+        """
+        if not self.frame_intervals:
+            return 0
+        values = sorted(self.frame_intervals)
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def section_averages(self):
+        """
+Returns a dict of name: average milliseconds of every part of the game loop
+        """
+        return {name: sum(values) / len(values) for name, values in self.sections.items() if values}
+
+    def histogram(self, bins, bin_width):
+        """
+Returns a list of `bins` counts of the stored frame times, where bin `i`
+counts the frames that took from `i * bin_width` to `(i+1) * bin_width`
+milliseconds (the last bin also counts every slower frame)
+        """
+        counts = [0] * bins
+        for interval in self.frame_intervals:
+            counts[min(bins - 1, int(interval / bin_width))] += 1
+        return counts
+
+
+class StartupProfiler:
+    """
+    This class records how long each phase of starting the game takes
+    (imports, `Backend.__init__()`, decoding every asset, each `init_*`
+    method of `App` and the first iteration of `mainloop()`), for
+    `python main.py --profile-startup`.
+
+    Phases are recorded with `with startup.phase(name):` from any thread,
+    so the work done by the threads of `Backend` is measured too. Phases
+    can be inside each other (the background is decoded during
+    `init_background`), so their times don't add up to the total.
+
+    Recording stops at `self.finish()`, after which `phase()` costs
+    nothing, so it is always on: the module level `startup` object below
+    is created when `main.py` imports this module, before anything else.
+    """
+
+    def __init__(self):
+        """
+- `self.phases`: list of `(name, thread name, start, milliseconds)`, where
+  `start` is the milliseconds since this object was made
+- `self.started_phases`: name: `time.perf_counter()` of the phases started
+  with `self.start()` and not stopped yet
+- `self.print_report`: print `self.report()` once startup is finished
+- `self.profile_output`: file the `cProfile` of the startup is saved
+  into (in `pstats` format), if any, see `self.start_cprofile()`
+        """
+        self.started = time.perf_counter()
+        self.phases = []
+        self.started_phases = {}
+        self.recording = True
+        self.total = None
+
+        self.print_report = False
+        self.profile_output = None
+        self.cprofile = None
+
+    def record(self, name, start):
+        """
+Stores the phase `name` which started at `start` (a `time.perf_counter()` value)
+        """
+        if self.recording:
+            now = time.perf_counter()
+            self.phases.append((name, threading.current_thread().name, (start - self.started) * 1000, (now - start) * 1000))
+
+    @contextmanager
+    def phase(self, name):
+        """
+Records the time the code inside `with self.phase(name):` takes
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def start(self, name):
+        """
+Starts the phase `name`, for phases which don't fit a `with` block
+        """
+        self.started_phases[name] = time.perf_counter()
+
+    def stop(self, name):
+        """
+Stops and records the phase `name` started with `self.start()`
+        """
+        start = self.started_phases.pop(name, None)
+        if start is not None:
+            self.record(name, start)
+
+    def start_cprofile(self, output):
+        """
+Runs `cProfile` from now until `self.finish()`, which saves it into the file `output`
+        """
+        import cProfile  # only imported when needed, it would slow the startup down
+
+        self.profile_output = output
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def finish(self):
+        """
+Ends the startup: stops recording, saves the `cProfile` and prints the
+report if they were asked for
+        """
+        if not self.recording:
+            return
+        self.total = (time.perf_counter() - self.started) * 1000
+        self.recording = False
+
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.profile_output)
+
+        if self.print_report:
+            report = self.report()
+            if sys.stdout is not None:
+                print(report)
+            if self.profile_output is not None:
+                # the windowed executable has no console, so the report is saved too
+                with open(str(self.profile_output) + ".txt", "w") as file:
+                    file.write(report + "\n")
+
+    def report(self):
+        """
+Returns the recorded phases as a text table, the slowest first
+        """
+        total = self.total if self.total is not None else (time.perf_counter() - self.started) * 1000
+        lines = [
+            f"startup took {total:.1f} ms",
+            f"{'ms':>9} {'%':>6} {'at ms':>9}  {'thread':<16} phase",
+        ]
+        for name, thread, start, elapsed in sorted(self.phases, key=lambda phase: phase[3], reverse=True):
+            lines.append(f"{elapsed:9.2f} {elapsed / total * 100:6.1f} {start:9.1f}  {thread:<16} {name}")
+        if self.profile_output is not None:
+            lines.append(f"cProfile saved into {self.profile_output}, see it with: python -m pstats {self.profile_output}")
+        return "\n".join(lines)
+
+
+startup = StartupProfiler()
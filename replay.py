@@ -0,0 +1,200 @@
+"""
+Recording and replaying rounds of Blappy Fird.
+
+A replay file stores everything needed to play a round again, and nothing else:
+
+    MAGIC
+    flags                       varint
+    seed of the round           varint
+    bird's y coordinate         8 byte float, where the idle animation left the bird
+    amount of hops              varint
+    hops                        one varint per hop, frames since the previous hop
+    frames the round lasted     varint
+    final score                 varint
+
+A varint stores 7 bits of a number per byte, the highest bit of every byte
+tells if another byte follows. Since a bird hops every few frames, most
+hops take a single byte.
+"""
+import struct
+import sys
+
+import collision
+from backend import Backend, read_png
+from world import World
+
+
+MAGIC = b"BFR1"  # first bytes of every replay file
+PIXEL_PERFECT = 1  # flag: the round used the sprites' masks for collisions
+
+
+def write_varint(buffer, number):
+    """
+Appends the unsigned integer `number` to the `bytearray` `buffer` as a varint
+    """
+    while number >= 0x80:
+        buffer.append((number & 0x7f) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def read_varint(data, position):
+    """
+Reads a varint from `data` starting at `position` and returns
+`(number, position_after_it)`
+    """
+    number = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+class Recorder:
+    """
+    This class records a round while it is being played, in `App` or by a
+    bot, and turns it into the bytes of a replay file with `finish()`.
+
+    Only the seed of the round, the bird's starting height and the frames
+    at which the bird hopped are stored, since `World` always simulates the
+    same round from the same seed and hops.
+    """
+
+    def __init__(self, world):
+        """
+Starts recording the round of `world`, which must not have been stepped yet
+        """
+        self.seed = world.seed
+        self.start_y = world.bird_y
+        self.pixel_perfect = world.has_masks()
+        self.hop_frames = []
+
+    def record_hop(self, frame):
+        """
+Stores that the bird hopped at the start of the step `frame`
+        """
+        self.hop_frames.append(frame)
+
+    def finish(self, world):
+        """
+Returns the bytes of the replay file of the round, which ended with the
+score and frame count of `world`
+        """
+        data = bytearray(MAGIC)
+        write_varint(data, PIXEL_PERFECT if self.pixel_perfect else 0)
+        write_varint(data, self.seed)
+        data += struct.pack("<d", self.start_y)
+
+        write_varint(data, len(self.hop_frames))
+        previous_frame = 0
+        for frame in self.hop_frames:
+            write_varint(data, frame - previous_frame)
+            previous_frame = frame
+
+        write_varint(data, world.frame)
+        write_varint(data, world.current_score)
+        return bytes(data)
+
+
+def decode_replay(data):
+    """
+Reads the bytes of a replay file and returns a dict with the keys
+`pixel_perfect`, `seed`, `start_y`, `hop_frames`, `frames` and `score`
+
+Raises a `ValueError` if `data` isn't a replay file
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a Blappy Fird replay file")
+
+    try:
+        position = len(MAGIC)
+        flags, position = read_varint(data, position)
+        seed, position = read_varint(data, position)
+        start_y, = struct.unpack_from("<d", data, position)
+        position += 8
+
+        hop_count, position = read_varint(data, position)
+        hop_frames = []
+        frame = 0
+        for i in range(hop_count):
+            delta, position = read_varint(data, position)
+            frame += delta
+            hop_frames.append(frame)
+
+        frames, position = read_varint(data, position)
+        score, position = read_varint(data, position)
+    except (IndexError, struct.error):
+        raise ValueError("the replay file is incomplete")
+
+    return {
+        "pixel_perfect": bool(flags & PIXEL_PERFECT),
+        "seed": seed,
+        "start_y": start_y,
+        "hop_frames": hop_frames,
+        "frames": frames,
+        "score": score,
+    }
+
+
+def make_world(pixel_perfect):
+    """
+Returns a new `World` like the one `App` uses, with the masks of the
+default bird and pillars if `pixel_perfect` is `True`
+    """
+    if not pixel_perfect:
+        return World()
+
+    bird_mask = collision.Bitmask.from_rgba(*read_png(Backend.DEFAULT_BIRD))
+    pillar_masks = (
+        collision.Bitmask.from_rgba(*read_png(Backend.DEFAULT_PILLAR_UP)),
+        collision.Bitmask.from_rgba(*read_png(Backend.DEFAULT_PILLAR_DOWN)),
+    )
+    return World(bird_mask=bird_mask, pillar_masks=pillar_masks)
+
+
+def play_replay(replay, world=None):
+    """
+- Simulates the round stored in `replay` (the dict returned by
+  `decode_replay()`) as fast as possible, without drawing anything
+- `world` can be passed to reuse a `World`, otherwise one is made
+  with `make_world()`
+
+Returns the `World` after the round ended (or after all the recorded
+frames were simulated, if the bird somehow survived them)
+    """
+    if world is None:
+        world = make_world(replay["pixel_perfect"])
+
+    world.reset(replay["seed"])
+    world.bird_y = replay["start_y"]
+
+    hop_frames = set(replay["hop_frames"])
+    while world.frame < replay["frames"]:
+        if world.step(world.frame in hop_frames):
+            break
+    return world
+
+
+def verify_replay(data, world=None):
+    """
+Returns `True` if simulating the replay file `data` again ends with the
+same score and at the same frame as it says it did
+    """
+    replay = decode_replay(data)
+    world = play_replay(replay, world)
+    return world.game_over and world.current_score == replay["score"] and world.frame == replay["frames"]
+
+
+if __name__ == '__main__':
+    # python replay.py FILE...  verifies the score of each replay file
+    all_valid = True
+    for path in sys.argv[1:]:
+        with open(path, "rb") as file:
+            replay_data = file.read()
+        valid = verify_replay(replay_data)
+        all_valid &= valid
+        print(f"{path}: score {decode_replay(replay_data)['score']}, {'valid' if valid else 'INVALID'}")
+    sys.exit(0 if all_valid else 1)
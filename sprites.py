@@ -0,0 +1,135 @@
+"""
+Batched drawing of canvas items, so a frame costs as few Tcl calls as possible.
+
+Every `tk.Canvas` method call is a round trip into the Tcl interpreter.
+Moving each pillar and background image on its own every frame costs one
+call per image, even for the ones that are off the screen. A `SpriteGroup`
+remembers where it last drew its items and only touches the ones that changed:
+    - the items inside the window share a canvas tag, and all the ones that
+      moved by the same amount (usually all of them, since the pillars and
+      the background scroll together) are moved with one `canvas.move(tag)`
+    - items outside the window aren't moved at all, until they come back
+"""
+
+
+class SpriteGroup:
+    """
+    A group of canvas items positioned by their top left corners, drawn with
+    `draw()` once per frame.
+
+    `self.calls` counts the canvas calls made by the last `draw()`, for the
+    performance HUD.
+    """
+
+    def __init__(self, canvas, tag, viewport_width, viewport_height):
+        """
+- `canvas`: the `tk.Canvas` the items are on
+- `tag`: a canvas tag only used by this group, given to the items of the
+  group that are inside the viewport
+- `viewport_width`, `viewport_height`: the visible area of the canvas,
+  starting at (0, 0)
+        """
+        self.canvas = canvas
+        self.tag = tag
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+
+        self.sizes = {}  # item: (width, height)
+        self.drawn_positions = {}  # item: (x, y) it is drawn at, None if unknown
+        self.tagged = set()  # items that currently have `self.tag`
+        self.calls = 0
+
+    def add(self, item, width, height, x=None, y=None):
+        """
+Adds the canvas item `item` (whose image is `width` x `height` pixels)
+to the group, or changes its size if it is already in it
+    - `x`, `y`: the top left corner it is drawn at right now, if known.
+      Otherwise it is moved to its position by the next `draw()`
+        """
+        self.sizes[item] = (width, height)
+        self.drawn_positions[item] = None if x is None else (x, y)
+        if x is not None and self.is_visible(item, x, y):
+            self.canvas.addtag_withtag(self.tag, item)
+            self.tagged.add(item)
+
+    def set_viewport(self, viewport_width, viewport_height):
+        """
+Changes the size of the viewport (for example when the game is scaled),
+every item is moved on its own by the next `draw()`
+        """
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        for item in self.drawn_positions:
+            self.drawn_positions[item] = None
+
+    def is_visible(self, item, x, y):
+        """
+Returns `True` if `item` would be at least partly inside the viewport
+with its top left corner at `(x, y)`
+        """
+        width, height = self.sizes[item]
+        return x < self.viewport_width and x + width > 0 and y < self.viewport_height and y + height > 0
+
+    def move_item_to(self, item, x, y, visible):
+        """
+Moves `item` on its own to `(x, y)`, and gives it the group's tag if
+it is `visible` (or takes it away if it isn't)
+        """
+        self.canvas.moveto(item, x, y)
+        self.calls += 1
+
+        if visible and item not in self.tagged:
+            self.canvas.addtag_withtag(self.tag, item)
+            self.tagged.add(item)
+            self.calls += 1
+        elif not visible and item in self.tagged:
+            self.canvas.dtag(item, self.tag)
+            self.tagged.discard(item)
+            self.calls += 1
+
+    def draw(self, placements):
+        """
+Draws the items of the group at their new positions
+    - `placements`: an iterable of `(item, x, y)` for every item of the
+      group, where `(x, y)` is the new top left corner of `item`
+
+- Items outside the viewport that were already drawn outside of it are skipped
+- The items inside the viewport are grouped by how far they moved, the
+  biggest group is moved with a single `canvas.move()` of the group's tag
+- Then every other item that has to move (the rest of the items inside
+  the viewport, the ones coming into or leaving it and the ones never
+  drawn) is put at its place on its own with `canvas.moveto()`
+        """
+        self.calls = 0
+        moved = {}  # (dx, dy): items with the group's tag that moved that much
+        single_moves = []  # (item, x, y, visible) moved on their own
+
+        for item, x, y in placements:
+            drawn_position = self.drawn_positions[item]
+            tagged = item in self.tagged
+            if drawn_position == (x, y):
+                if tagged:
+                    moved.setdefault((0, 0), []).append((item, x, y))
+                continue
+
+            visible = self.is_visible(item, x, y)
+            if tagged and visible and drawn_position is not None:
+                moved.setdefault((x - drawn_position[0], y - drawn_position[1]), []).append((item, x, y))
+            elif visible or tagged or drawn_position is None:
+                single_moves.append((item, x, y, visible))
+            else:
+                continue  # off the screen and already drawn off the screen
+            self.drawn_positions[item] = (x, y)
+
+        if moved:
+            delta = max(moved, key=lambda delta: len(moved[delta]))
+            if delta != (0, 0):
+                self.canvas.move(self.tag, *delta)
+                self.calls += 1
+            # the other items with the tag are put back where they belong
+            for other_delta, items in moved.items():
+                if other_delta != delta:
+                    single_moves += [(item, x, y, True) for item, x, y in items]
+
+        for item, x, y, visible in single_moves:
+            self.move_item_to(item, x, y, visible)
@@ -0,0 +1,291 @@
+"""
+Training bots for Blappy Fird with neuroevolution.
+
+    python train.py --generations 50
+    python train.py --population 256 --episodes 32 --hidden 16
+    python train.py watch
+
+A bot is a small neural network (an MLP with one hidden layer) which gets
+the observation of `environment.BlappyFirdEnv` (`BatchWorld.observe()` for
+many rounds at once) and hops if its output is positive. The trainer is a
+cross-entropy method evolution strategy: every
+generation, a population of networks is sampled around the current mean
+weights, every one of them plays `--episodes` rounds, and the mean and
+spread of the weights are fitted again to the best `--elite` fraction.
+
+The whole population plays at once in one `BatchWorld`, and the networks
+of all the members are evaluated together with one batched matrix product
+per layer per step, so a generation costs about as much as stepping the
+rounds themselves.
+
+After every generation, the mean, the spread and the best network found so
+far are saved into `training/checkpoint.npz` in the game's user data
+directory (see `Backend.get_settings_directory()`), and training continues from
+there the next time. `python train.py watch` plays the game in the window
+with the best network, and `python evaluate.py --policy train:best_policy`
+evaluates it on many seeds.
+
+Needs `numpy`.
+"""
+import argparse
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+
+import backend
+from batch_world import BatchWorld
+from environment import OBSERVATION_SIZE, observe
+
+
+OBSERVATION_SCALE = np.array([500, 10, 600, 250])
+# rough range of each observation value, which the networks get divided by,
+# so all their inputs are around -1 to 1
+
+
+def default_checkpoint_path():
+    """
+Returns the path of the checkpoint in the game's user data directory
+    """
+    return backend.Backend.get_settings_directory() / "training" / "checkpoint.npz"
+
+
+def parameter_count(hidden):
+    """
+Returns the amount of weights and biases of a network with `hidden` hidden units
+    """
+    return OBSERVATION_SIZE * hidden + hidden + hidden + 1
+
+
+def unpack(parameters, hidden):
+    """
+Splits `parameters`, an array of shape `(members, parameter_count(hidden))`,
+into the layers of every member's network: `(w1, b1, w2, b2)` with the
+shapes `(members, 4, hidden)`, `(members, 1, hidden)`, `(members, hidden, 1)`
+and `(members, 1, 1)`
+    """
+    members = len(parameters)
+    sizes = [OBSERVATION_SIZE * hidden, hidden, hidden, 1]
+    w1, b1, w2, b2 = np.split(parameters, np.cumsum(sizes)[:-1], axis=1)
+    return (
+        w1.reshape(members, OBSERVATION_SIZE, hidden),
+        b1.reshape(members, 1, hidden),
+        w2.reshape(members, hidden, 1),
+        b2.reshape(members, 1, 1),
+    )
+
+
+def decide(layers, observations):
+    """
+Returns the hop decisions (a boolean array of shape `(members, rounds)`)
+of the networks `layers` (see `unpack()`) for `observations`, an array of
+shape `(members, rounds, 4)` holding the observations of the rounds of
+every member
+    - the layers of all the members are applied with one batched matrix
+      product each (`np.matmul` over the first axis)
+    """
+    w1, b1, w2, b2 = layers
+    hidden = np.tanh(np.matmul(observations / OBSERVATION_SCALE, w1) + b1)
+    return (np.matmul(hidden, w2) + b2)[:, :, 0] > 0
+
+
+def play_population(parameters, hidden, episodes, max_frames, seed=None):
+    """
+Plays `episodes` rounds with every network in `parameters` (shape
+`(members, parameter_count(hidden))`), all at once in one `BatchWorld`
+
+Returns `(frames, scores)`, the mean amount of frames survived and the
+mean score of every member
+    """
+    members = len(parameters)
+    layers = unpack(parameters, hidden)
+    batch = BatchWorld(members * episodes, seed=seed)
+
+    for _ in range(max_frames):
+        observations = batch.observe().reshape(members, episodes, OBSERVATION_SIZE)
+        if not batch.step(decide(layers, observations).reshape(-1)).any():
+            break
+
+    frames = batch.frame.reshape(members, episodes).mean(axis=1)
+    scores = batch.current_score.reshape(members, episodes).mean(axis=1)
+    return frames, scores
+
+
+class Trainer:
+    """
+    This class trains the networks with the cross-entropy method and
+    saves its progress into a checkpoint, see the top of this file.
+
+    The fitness of a network is the mean amount of frames its rounds
+    lasted, which grows with the pillars passed but also rewards staying
+    alive a bit longer in between.
+    """
+
+    def __init__(self, hidden=8, population=128, episodes=16, elite=0.125, max_frames=3000, seed=None):
+        """
+- `hidden`: amount of hidden units of the networks
+- `population`: networks played every generation
+- `episodes`: rounds played by every network every generation
+- `elite`: fraction of the population the weights are fitted to
+- `max_frames`: a round is stopped after this many frames (45 seconds),
+  since good networks may never die
+- `self.mean`, `self.spread`: the distribution the networks are sampled from
+- `self.best`: the best network found so far and `self.best_fitness` its fitness
+- `self.history`: `(frames, score)` of the mean network and the mean frames
+  of the whole population, for every generation
+        """
+        self.hidden = hidden
+        self.population = population
+        self.episodes = episodes
+        self.elite = max(2, int(population * elite))
+        self.max_frames = max_frames
+        self.rng = np.random.default_rng(seed)
+
+        self.mean = np.zeros(parameter_count(hidden))
+        self.spread = np.ones(parameter_count(hidden))
+        self.best = self.mean.copy()
+        self.best_fitness = -1.0
+        self.generation = 0
+        self.history = []
+
+    def run_generation(self):
+        """
+Samples, plays and selects one generation, returns its row of `self.history`
+    - the current mean is always a member of the population (the first one)
+    - the spread never goes below 0.02, so the search doesn't get stuck
+    - `self.best` is the mean network that did best so far. The best
+      sampled network of a generation is mostly the luckiest one on these
+      few rounds, while the mean's own result isn't picked for luck
+        """
+        parameters = self.mean + self.spread * self.rng.standard_normal((self.population, len(self.mean)))
+        parameters[0] = self.mean
+
+        frames, scores = play_population(
+            parameters, self.hidden, self.episodes, self.max_frames, seed=int(self.rng.integers(2**32))
+        )
+        order = np.argsort(-frames)
+        elite = parameters[order[:self.elite]]
+        self.mean = elite.mean(axis=0)
+        self.spread = np.maximum(elite.std(axis=0), 0.02)
+
+        if frames[0] > self.best_fitness:
+            self.best = parameters[0].copy()
+            self.best_fitness = float(frames[0])
+
+        self.generation += 1
+        row = (float(frames[0]), float(scores[0]), float(frames.mean()))
+        self.history.append(row)
+        return row
+
+    def save(self, path):
+        """
+Saves the trainer into the file `path` (a `.npz` file), atomically so a
+training stopped while saving never leaves a broken checkpoint
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, hidden=self.hidden, mean=self.mean, spread=self.spread, best=self.best,
+            best_fitness=self.best_fitness, generation=self.generation, history=np.array(self.history).reshape(-1, 3)
+        )
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        backend.write_file_atomically(path, buffer.getvalue())
+
+    def load(self, path):
+        """
+Continues from the checkpoint at `path`, which must have the same amount
+of hidden units
+        """
+        with np.load(path) as checkpoint:
+            if int(checkpoint["hidden"]) != self.hidden:
+                raise ValueError(f"{path} has {int(checkpoint['hidden'])} hidden units, not {self.hidden}")
+            self.mean = checkpoint["mean"]
+            self.spread = checkpoint["spread"]
+            self.best = checkpoint["best"]
+            self.best_fitness = float(checkpoint["best_fitness"])
+            self.generation = int(checkpoint["generation"])
+            self.history = [tuple(row) for row in checkpoint["history"]]
+
+
+def load_policy(path=None):
+    """
+Returns a policy function (a `World` goes in, `True` for a hop comes out)
+playing with the best network of the checkpoint at `path` (the default
+checkpoint if `None`), like the policies of `evaluate.py`
+    """
+    with np.load(path or default_checkpoint_path()) as checkpoint:
+        hidden = int(checkpoint["hidden"])
+        layers = unpack(checkpoint["best"][None], hidden)
+
+    def policy(world):
+        return bool(decide(layers, np.array(observe(world))[None, None])[0, 0])
+
+    return policy
+
+
+best_policy_function = None
+
+
+def best_policy(world):
+    """
+The policy of the best network of the default checkpoint, for
+`python evaluate.py --policy train:best_policy`
+    """
+    global best_policy_function
+    if best_policy_function is None:
+        best_policy_function = load_policy()
+    return best_policy_function(world)
+
+
+def watch(path=None):
+    """
+Opens the game with the best network of the checkpoint at `path` playing
+every round, see `App.autopilot`
+    - after a game over, the next round starts by itself. The rounds of the
+      bot aren't saved into the player's highscore, replays or leaderboard
+    - the game checks collisions with the pixel perfect masks of the sprites,
+      while the network was trained with the rectangle hitboxes of
+      `BatchWorld`, so its scores can differ from the ones it reached in training
+    """
+    from main import App
+
+    app = App(run=False)
+    app.autopilot = load_policy(path)
+    app.new_game()
+    app.mainloop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trains bots for Blappy Fird with neuroevolution")
+    parser.add_argument("command", nargs="?", choices=["train", "watch"], default="train", help="train (default) or watch the best bot play")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: training/checkpoint.npz in the game's user data directory)")
+    parser.add_argument("--generations", type=int, default=100, help="generations to train (default: %(default)s)")
+    parser.add_argument("--population", type=int, default=128, help="networks per generation (default: %(default)s)")
+    parser.add_argument("--episodes", type=int, default=16, help="rounds played by every network per generation (default: %(default)s)")
+    parser.add_argument("--hidden", type=int, default=8, help="hidden units of the networks (default: %(default)s)")
+    parser.add_argument("--max-frames", type=int, default=3000, help="frames after which a round is stopped (default: %(default)s)")
+    parser.add_argument("--restart", action="store_true", help="don't continue from the checkpoint")
+    parser.add_argument("--seed", type=int, help="seed of the training")
+    arguments = parser.parse_args()
+
+    checkpoint = arguments.checkpoint or default_checkpoint_path()
+    if arguments.command == "watch":
+        watch(checkpoint)
+        return
+
+    trainer = Trainer(arguments.hidden, arguments.population, arguments.episodes, max_frames=arguments.max_frames, seed=arguments.seed)
+    if not arguments.restart and Path(checkpoint).exists():
+        trainer.load(checkpoint)
+        print(f"continuing from generation {trainer.generation} of {checkpoint}")
+
+    print(f"{'generation':>10} {'frames':>8} {'score':>7} {'population frames':>18} {'seconds':>8}")
+    for _ in range(arguments.generations):
+        start = time.perf_counter()
+        frames, score, population_frames = trainer.run_generation()
+        trainer.save(checkpoint)
+        print(f"{trainer.generation:>10} {frames:>8.1f} {score:>7.2f} {population_frames:>18.1f} {time.perf_counter() - start:>8.2f}")
+    print(f"saved into {checkpoint}")
+
+
+if __name__ == '__main__':
+    main()
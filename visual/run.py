@@ -0,0 +1,213 @@
+"""
+Golden image tests of the drawing of Blappy Fird.
+
+Run from anywhere:
+
+    python visual/run.py                    compare every case with its golden images
+    python visual/run.py --only mainmenu    compare only some cases
+    python visual/run.py --record           make the golden images again, after changing the drawing on purpose
+    python visual/run.py --tolerance 8 --workers 4
+
+Every case in `CASES` plays a round of a seed with a scripted list of hops
+(the steps the bird hops at, like in a replay file) and draws some of its
+frames with `headless.FrameRenderer`, so no display is needed. Every frame
+is compared with its golden image `visual/goldens/<case>_<frame>.png`: a
+pixel differs if any of its channels differs by more than `--tolerance`,
+and a frame fails if any pixel differs.
+
+The frames are checked in parallel by a `concurrent.futures.ProcessPoolExecutor`,
+one process per CPU core. Each frame is a job of its own, which plays its
+case again up to that frame (stepping a round costs far less than drawing
+and comparing a frame), so the work is spread evenly even when one case
+has many more frames than the others.
+
+For every failed frame, the frame drawn now (`<case>_<frame>.png`) and its
+differing pixels painted red over the golden image (`<case>_<frame>_diff.png`)
+are written into `visual/failures/` (emptied at the start of every run),
+and the script exits with 1.
+
+What the cases check:
+    - mainmenu: the layout of the images of the main menu (`world.MAINMENU_LAYOUT`)
+      over the scrolling background
+    - pre_round: the help image
+    - round: the placement and shifting of the pillars and the bird's
+      movement, for 1250 steps (about 19 seconds)
+    - seams: the background alone, around the steps where its leftmost
+      image is shifted to the right (`world.Background.shift_unseen()`),
+      the places the images overlap at move a bit with every shift
+Texts (the scoreboard and the labels of the main menu) aren't drawn by the
+headless renderer, so they aren't checked.
+
+The tests only read the files of the game: the assets, and the golden
+images. Nothing is read from or written into the player's user data directory.
+
+Needs `numpy`.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+GAME_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIRECTORY)
+os.chdir(GAME_DIRECTORY)  # `backend.resource_path()` finds the assets from the current directory
+
+import numpy as np
+
+import backend
+import headless
+import replay
+from world import Background
+
+GOLDENS_DIRECTORY = os.path.join(GAME_DIRECTORY, "visual", "goldens")
+FAILURES_DIRECTORY = os.path.join(GAME_DIRECTORY, "visual", "failures")
+
+MAINMENU = ("play_button", "exit_button", "highscore_label", "leaderboard_label", "logo")
+# the widgets of the main menu, in the order `App.show_mainmenu()` lifts them
+
+CASES = {
+    # name: the round and the frames drawn of it
+    #   - seed: seed of the round
+    #   - hops: the steps the bird hops at
+    #   - frames: the steps after which a frame is drawn and compared
+    #   - running: `False` for the screens before a round, where only the background moves
+    #   - overlays: the images drawn over the frame, see `headless.FrameRenderer.render()`
+    "mainmenu": {
+        "seed": 0, "hops": [], "frames": [0, 700], "running": False, "overlays": MAINMENU,
+    },
+    "pre_round": {
+        "seed": 0, "hops": [], "frames": [0], "running": False, "overlays": ("help",),
+    },
+    "round": {
+        "seed": 7,
+        "hops": [
+            15, 49, 83, 117, 143, 177, 220, 256, 296, 325, 343, 370, 405, 439, 489, 520, 538, 569, 612, 646,
+            687, 719, 737, 762, 812, 846, 864, 897, 925, 959, 994, 1028, 1064, 1108, 1142, 1176, 1196, 1227,
+        ],
+        "frames": [0, 16, 140, 400, 750, 1004, 1250],
+        "running": True, "overlays": (),
+    },
+    "seams": {
+        "seed": 0, "hops": [], "frames": [1003, 1004, 2004, 3004, 3005, 3995], "running": False, "overlays": (),
+    },
+}
+
+renderer = None  # the `headless.FrameRenderer` of this process, made by `start_worker()`
+
+
+def start_worker():
+    """
+Makes the renderer of a worker process, once for all its jobs
+    - its images are read by a `backend.AtlasReader` of the process, which
+      only reads the asset files: no `Backend` is made, so the tests never
+      touch the player's user data directory (highscore, leaderboard)
+    """
+    global renderer
+    renderer = headless.FrameRenderer(backend.AtlasReader())
+
+
+def draw_case_frame(case, frame):
+    """
+Plays `case` (a value of `CASES`) up to the step `frame` and returns its
+drawing, an RGBA array
+    - raises a `ValueError` if the bird dies before that, which means the
+      hops of the case don't fit the round anymore (the physics or the
+      pillars changed)
+    """
+    world = replay.make_world(False)
+    world.reset(case["seed"])
+    background = Background(renderer.width)
+
+    if case["running"]:
+        hops = set(case["hops"])
+        for _ in headless.play(world, background, lambda world: world.frame in hops, frame):
+            pass
+        if world.frame < frame:
+            raise ValueError(f"the bird died at step {world.frame}, the hops of the case don't fit the round anymore")
+    else:
+        for _ in range(frame):
+            background.scroll()
+
+    return renderer.render(world, background, pillars=case["running"], overlays=case["overlays"])
+
+
+def golden_path(name, frame):
+    return os.path.join(GOLDENS_DIRECTORY, f"{name}_{frame}.png")
+
+
+def check_frame(name, frame, tolerance, record):
+    """
+Draws the frame `frame` of the case `name` and compares it with its golden
+image (or writes it as the golden image, if `record` is `True`)
+
+Returns `(name, frame, error)`, where `error` is `None` if the frame
+matches and otherwise tells what went wrong
+    """
+    try:
+        drawing = draw_case_frame(CASES[name], frame)
+    except ValueError as error:
+        return name, frame, str(error)
+    height, width = drawing.shape[:2]
+
+    if record:
+        backend.write_png(golden_path(name, frame), width, height, drawing.tobytes())
+        return name, frame, None
+
+    try:
+        golden_width, golden_height, golden_pixels = backend.read_png(golden_path(name, frame))
+    except OSError:
+        return name, frame, "no golden image, make it with --record"
+    if (golden_width, golden_height) != (width, height):
+        return name, frame, f"the golden image is {golden_width}x{golden_height}, the frame is {width}x{height}"
+
+    golden = np.frombuffer(bytes(golden_pixels), dtype=np.uint8).reshape(height, width, 4)
+    difference = np.abs(drawing.astype(np.int16) - golden).max(axis=2)
+    differing = difference > tolerance
+    if not differing.any():
+        return name, frame, None
+
+    os.makedirs(FAILURES_DIRECTORY, exist_ok=True)
+    backend.write_png(os.path.join(FAILURES_DIRECTORY, f"{name}_{frame}.png"), width, height, drawing.tobytes())
+    diff_image = golden // 3
+    diff_image[:, :, 3] = 255
+    diff_image[differing] = (255, 0, 0, 255)
+    backend.write_png(os.path.join(FAILURES_DIRECTORY, f"{name}_{frame}_diff.png"), width, height, diff_image.tobytes())
+    return name, frame, f"{int(differing.sum())} pixels differ (by up to {int(difference.max())})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blappy Fird golden image tests")
+    parser.add_argument("--only", nargs="+", choices=CASES, help="check only these cases")
+    parser.add_argument("--record", action="store_true", help="write the frames as the new golden images instead of comparing them")
+    parser.add_argument("--tolerance", type=int, default=2, help="largest difference of a color channel that still matches (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="amount of processes (default: one per CPU core)")
+    arguments = parser.parse_args()
+
+    if arguments.record:
+        os.makedirs(GOLDENS_DIRECTORY, exist_ok=True)
+    elif os.path.isdir(FAILURES_DIRECTORY):
+        for file_name in os.listdir(FAILURES_DIRECTORY):
+            os.remove(os.path.join(FAILURES_DIRECTORY, file_name))  # left by the last run
+
+    jobs = [(name, frame) for name in arguments.only or CASES for frame in CASES[name]["frames"]]
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(arguments.workers, initializer=start_worker) as executor:
+        futures = [executor.submit(check_frame, name, frame, arguments.tolerance, arguments.record) for name, frame in jobs]
+        for future in futures:
+            name, frame, error = future.result()
+            if error is not None:
+                print(f"{name} frame {frame}: FAILED, {error}")
+            else:
+                print(f"{name} frame {frame}: {'recorded' if arguments.record else 'ok'}")
+            failed += error is not None
+
+    print(f"{len(jobs)} frames in {time.perf_counter() - start:.1f} s, {failed} failed", file=sys.stderr)
+    if failed and not arguments.record:
+        print(f"the frames drawn now and their differences are in {FAILURES_DIRECTORY}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+import math
+import random
+
+import collision
+
+MAINMENU_LAYOUT = {
+    # widget: (x, y) of its center, x counted from the middle of the window
+    "play_button": (0, 310),
+    "exit_button": (0, 370),
+    "highscore_label": (0, 430),
+    "leaderboard_label": (0, 462),
+    "logo": (0, 130),
+    "help": (0, 420),  # only shown on the pre round screen
+}
+# used by `App` and drawn by `headless.FrameRenderer` (so the golden images of
+# `visual/run.py` notice a changed layout), kept here since it needs no tkinter
+
+
+class World:
+    """
+    This class contains the simulation of a round of Blappy Fird, without
+    any tkinter code in it. It stores the bird's position and velocity,
+    the positions of the pillars, the score and whether the bird died.
+
+    `App` in `main.py` only draws whatever is stored in here, which means a
+    `World` can also be stepped on its own (no window or display needed),
+    for example to simulate thousands of rounds for bots or tests.
+
+    One call of `step()` simulates `TICK_MS` milliseconds of the game. The
+    game runs at the same speed at any frame rate because `App` calls it
+    once for every `TICK_MS` milliseconds that really passed, however many
+    frames that is (see `App.game_loop()`), and a round stepped without a
+    window gives exactly the same result as the same round in the game.
+    """
+    TICK_MS = 15  # the old gravity interval, one step of the simulation
+
+    def __init__(self, width=600, height=500, bird_size=(56, 43), pillar_size=(100, 400), bird_mask=None, pillar_masks=None, substeps=1):
+        """
+- `width` and `height` are the dimensions of the game window
+- `bird_size` and `pillar_size` are the (width, height) of the bird
+  and pillar images, used for the collision and score checks
+- `bird_mask` and `pillar_masks` (upper, lower) are the `collision.Bitmask`
+  objects of the bird and pillar images. If all of them are given, the
+  collisions are pixel perfect, otherwise `self.bird_hitboxes` is used
+- `substeps`: amount of smaller steps every `step()` is integrated in,
+  see `self.step()`
+        """
+        self.game_window_width = width
+        self.game_window_height = height
+        self.bird_width, self.bird_height = bird_size
+        self.pillar_width, self.pillar_height = pillar_size
+        self.bird_mask = bird_mask
+        self.pillar_masks = pillar_masks
+        self.substeps = substeps
+
+        self.init_bird()
+        self.init_pillars()
+        self.current_score = 0
+        self.game_over = False
+        self.frame = 0
+
+    def init_bird(self):
+        """
+Defines the properties of the bird, same as they were in `App.init_bird()`
+    - `self.bird_x`, `self.bird_y`: top left corner of the bird
+    - `self.bird_velocity`: pixels the bird moves downwards every step
+    - `self.terminal_velocity`: maximum downwards velocity
+    - `self.gravity_acceleration`: pixels added to the velocity every step
+    - `self.hop_velocity`: velocity given to the bird when it hops
+    - `self.bottom_death_limit`: the bird dies if its center goes below this
+    - `self.bird_hitboxes`: rectangles covering the bird's body and beak,
+      relative to its top left corner (see `collision.BIRD_HITBOXES`)
+        """
+        self.bird_spawnpoint = (200, 200)
+        self.bird_x, self.bird_y = self.bird_spawnpoint
+
+        self.bird_velocity = 0
+        self.terminal_velocity = 9.5  # maximum downwards velocity the bird can reach
+        self.gravity_acceleration = 0.6  # pixels per step that will be added to the bird's velocity
+        self.hop_velocity = -10.5
+        self.bottom_death_limit = self.game_window_height - 30  # coords below which the bird dies, for ground death
+        self.bird_hitboxes = collision.BIRD_HITBOXES
+
+    def init_pillars(self):
+        """
+Defines the properties of the pillars, same as they were in `App.init_pillars()`
+    - `self.pillar_speed`: pixels the pillars move to the left every step
+      (the pillars used to move 3 pixels every 10 milliseconds)
+
+The pairs of pillars are stored in a pool, `self.initial_pillar_positions`
+(see `self.update_pillar_pool()`)
+    - each pair is a list `[x, random_shift]` where `x` is the left edge
+      of both pillars and `random_shift` is added to the standard y coordinates
+    - the pool is a ring buffer: the pairs never change their place in it,
+      so the n-th pair always belongs to the n-th pair drawn on the canvas.
+      `self.first_pillar_index` points to the leftmost pair, the one that
+      gets shifted next
+    - `self.pillars` is the same list, used for the collision checks
+        """
+        self.pillar_spawnpoint_x = self.game_window_width + 100  # x coord of the first off-screen pillar in a new round
+        self.pillar_distance = 300  # distance between 2 pillars' top left corners
+        self.pillar_hole_gap = 170  # distance between bottom edge of top pillar and top edge of bottom pillar
+        self.pillar_speed = 3 * self.TICK_MS / 10
+        self.update_standard_pillar_positions()
+
+        self.initial_pillar_positions = []
+        self.update_pillar_pool()
+        self.reset_pillars_to_initial_position()
+
+    def update_pillar_pool(self):
+        """
+Makes `self.initial_pillar_positions` hold just enough pairs of pillars
+for the window width and the distance between pillars
+    - a pair is shifted when the last one is `self.pillar_distance` pixels
+      away from `self.pillar_spawnpoint_x`, which puts the leftmost pair at
+      `self.pillar_spawnpoint_x - count * self.pillar_distance` (or further
+      left, by less than `self.pillar_speed`, depending on where the step
+      ended). It must be fully out of the window by then, so
+      `count = ceil((pillar_spawnpoint_x + pillar_width) / pillar_distance)`
+      (3 for the default window)
+- The pool is only remade if the count changed, then
+  `self.reset_pillars_to_initial_position()` has to be called. Has to be
+  called again after `self.pillar_distance` or `self.pillar_spawnpoint_x`
+  are changed
+        """
+        count = math.ceil((self.pillar_spawnpoint_x + self.pillar_width) / self.pillar_distance)
+        if count != len(self.initial_pillar_positions):
+            self.initial_pillar_positions = [[0, 0] for i in range(count)]
+            self.pillars = self.initial_pillar_positions
+
+    def update_standard_pillar_positions(self):
+        """
+Sets `self.STANDARD_PILLAR_UP_Y` and `self.STANDARD_PILLAR_DOWN_Y`, the y
+coordinates of the upper and lower pillar when `random_shift` is 0, which
+makes the hole lie exactly in the center of the window height
+    - has to be called again after `self.pillar_hole_gap` is changed
+        """
+        self.STANDARD_PILLAR_UP_Y = (self.game_window_height - self.pillar_hole_gap)/2 - self.pillar_height
+        self.STANDARD_PILLAR_DOWN_Y = self.STANDARD_PILLAR_UP_Y + self.pillar_height + self.pillar_hole_gap
+
+    def reset(self, seed=None):
+        """
+Resets everything for a new round: the bird, the pillars and the score
+    - `seed` is the seed of the round's random generator (see
+      `self.reset_pillars_to_initial_position()`)
+        """
+        self.reset_bird()
+        self.reset_pillars_to_initial_position(seed)
+        self.reset_score()
+
+    def reset_bird(self):
+        """
+Moves the bird back to its spawnpoint and stops it
+        """
+        self.bird_x, self.bird_y = self.bird_spawnpoint
+        self.bird_velocity = 0
+
+    def reset_score(self):
+        """
+Sets the score to 0 and revives the bird
+        """
+        self.current_score = 0
+        self.game_over = False
+        self.frame = 0
+
+    def reset_pillars_to_initial_position(self, seed=None):
+        """
+- Every round has its own random generator `self.rng`, made here from
+  `seed` (a new random seed is picked if it is `None`) which is stored in
+  `self.seed`. The same seed always gives the same pillars, which is what
+  makes replays (see `replay.py`) possible
+- Starting from `self.pillar_spawnpoint_x`, the pairs of pillars are
+  placed `self.pillar_distance` pixels apart
+- A random value from -100 to 100 in the factor of 10 is used as the
+  `random_shift` of each pair
+        """
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+
+        for i, pillar in enumerate(self.initial_pillar_positions):
+            pillar[0] = self.pillar_spawnpoint_x + (self.pillar_distance * i)
+            pillar[1] = self.rng.randint(-10, 10) * 10
+
+        self.first_pillar_index = 0
+        self.currently_tracking_index = 0
+
+    def make_bird_hop(self):
+        """
+Gives the bird an upwards velocity of `self.hop_velocity`
+        """
+        self.bird_velocity = self.hop_velocity
+
+    def make_bird_fall(self, dt=1):
+        """
+Moves the bird for `dt` steps (a fraction of a step when sub-stepping)
+with semi-implicit Euler: `self.bird_velocity` is increased by
+`self.gravity_acceleration * dt` first (capped at `self.terminal_velocity`)
+and the bird is then moved by the new velocity
+        """
+        self.bird_velocity += self.gravity_acceleration * dt
+        self.bird_velocity = min(self.bird_velocity, self.terminal_velocity)
+        self.bird_y += self.bird_velocity * dt
+
+    def move_pillars(self, dt=1):
+        """
+Moves all the pairs of pillars to the left by `self.pillar_speed * dt` pixels
+        """
+        distance = self.pillar_speed * dt
+        for pillar in self.pillars:
+            pillar[0] -= distance
+
+    def shift_unseen_pillar(self):
+        """
+- As soon as the last pillar is `self.pillar_distance` pixels away from
+  `self.pillar_spawnpoint_x`, the first (off-screen) pillar is shifted
+  right behind it and its height is randomised again
+- `self.first_pillar_index` moves to the next pair, so the shifted pair
+  becomes the last one without moving anything in the pool
+        """
+        pool = self.initial_pillar_positions
+        last_pillar_x = pool[self.first_pillar_index - 1][0]
+        if self.pillar_spawnpoint_x - last_pillar_x < self.pillar_distance:
+            return
+
+        first_pillar = pool[self.first_pillar_index]
+        first_pillar[0] = last_pillar_x + self.pillar_distance
+        first_pillar[1] = self.rng.randint(-10, 10) * 10
+        self.first_pillar_index = (self.first_pillar_index + 1) % len(pool)
+
+    def gap_of(self, pillar):
+        """
+Returns the y coordinates `(top, bottom)` of the hole between the
+pair of pillars `pillar`
+        """
+        gap_top = self.STANDARD_PILLAR_UP_Y + self.pillar_height + pillar[1]
+        return gap_top, gap_top + self.pillar_hole_gap
+
+    def has_masks(self):
+        """
+Returns `True` if the masks of the bird and both pillars are known,
+which makes the collisions pixel perfect
+        """
+        return self.bird_mask is not None and self.pillar_masks is not None and None not in self.pillar_masks
+
+    def bird_collides_with_pillars(self):
+        """
+Checks the bird against every pair of pillars
+    - pixel by pixel with `collision.bird_mask_hits_pillars()`, if the
+      masks of the bird and the pillars are known
+    - otherwise the rectangles in `self.bird_hitboxes` are checked with
+      `collision.bird_hits_pillars()`
+        """
+        if self.has_masks():
+            return collision.bird_mask_hits_pillars(
+                self.bird_x, self.bird_y, self.bird_mask, self.pillars, self.pillar_width,
+                self.STANDARD_PILLAR_UP_Y, self.STANDARD_PILLAR_DOWN_Y, self.pillar_masks
+            )
+
+        return collision.bird_hits_pillars(
+            self.bird_x, self.bird_y, self.pillars, self.pillar_width,
+            self.STANDARD_PILLAR_UP_Y + self.pillar_height, self.pillar_hole_gap,
+            self.bird_hitboxes
+        )
+
+    def check_pillar_for_score(self):
+        """
+- Checks if the bird has crossed the pillar it is currently tracking
+- If it has and the bird is flying above the window, it would have hit
+  the off-screen upper pillar, so `True` is returned
+- Otherwise the score is increased and the next pillar is tracked
+        """
+        pillar = self.initial_pillar_positions[self.currently_tracking_index]
+        bird_center_x = self.bird_x + self.bird_width/2
+        bird_center_y = self.bird_y + self.bird_height/2
+
+        if pillar[0] + self.pillar_width/2 < bird_center_x:
+            if bird_center_y < 0:
+                return True
+
+            self.current_score += 1
+            self.currently_tracking_index += 1
+            self.currently_tracking_index %= len(self.initial_pillar_positions)
+        return False
+
+    def check_if_player_lost(self):
+        """
+Sets `self.game_over` to `True` if the bird flew over a pillar, hit a
+pillar or reached `self.bottom_death_limit`
+        """
+        if (
+            self.check_pillar_for_score()
+            or self.bird_collides_with_pillars()
+            or self.bird_y + self.bird_height/2 >= self.bottom_death_limit
+        ):
+            self.game_over = True
+
+    def step(self, hop=False):
+        """
+Simulates one step (`TICK_MS` milliseconds) of a running round
+    - if `hop` is `True`, the bird hops before gravity is applied
+    - the bird falls, the pillars move and get shifted, and the
+      score and collisions are checked
+    - with `self.substeps` above 1, this is done `self.substeps` times for
+      an equal part of the step each, so fast birds can't skip through the
+      edge of a pillar between 2 checks. The round ends at the first sub-step
+      the bird dies in. With 1 (the default), the results are exactly the
+      ones of the original game, which the replays rely on
+
+Returns `self.game_over`. Once the bird is dead, stepping does nothing
+until `self.reset()` is called
+        """
+        if self.game_over:
+            return True
+
+        if hop:
+            self.make_bird_hop()
+
+        dt = 1 / self.substeps
+        for substep in range(self.substeps):
+            self.make_bird_fall(dt)
+            self.move_pillars(dt)
+            self.shift_unseen_pillar()
+            self.check_if_player_lost()
+            if self.game_over:
+                break
+        self.frame += 1
+
+        return self.game_over
+
+
+class Background:
+    """
+    This class contains the scrolling of the background images, without
+    any tkinter code in it, like `World` does for a round.
+
+    The background is made of `count` images of the window's width placed
+    side to side, which scroll to the left on every step, whether a round
+    is running or not. `App` draws them on the canvas and the headless
+    renderer (`headless.py`) draws them into an array, both from here.
+    """
+
+    def __init__(self, width=600, count=3):
+        """
+- `width`: the width of the game window, which is also the width of the
+  background images
+- `self.positions`: x coordinate of the top left corner of every image,
+  always in the order the images were made in (so the order they are
+  drawn in), not the order they are seen in
+- `self.first_image_index`: index of the leftmost image in `self.positions`
+- `self.scroll_speed`: pixels the background scrolls every step
+  (it used to scroll 2 pixels every 50 milliseconds)
+        """
+        self.width = width
+        self.positions = [width * i for i in range(count)]
+        self.first_image_index = 0
+        self.scroll_speed = 2 * World.TICK_MS / 50
+
+    def scroll(self):
+        """
+Simulates one step (`World.TICK_MS` milliseconds) of the background
+    - moves every image to the left by `self.scroll_speed` pixels
+    - shifts the leftmost one, see `self.shift_unseen()`
+        """
+        self.positions = [x - self.scroll_speed for x in self.positions]
+        self.shift_unseen()
+
+    def shift_unseen(self):
+        """
+This method checks if the first background image has gone out of view
+or not
+    - Since the image and the window have a 600 pixel width, it checks
+      if the top left corner of the first image is less than -602
+
+If it is, the image is shifted to the right side of the third image,
+basically by around (600*2) units, since that's the width of 2 images placed side to side
+    - `self.first_image_index` moves to the next image, so the shifted
+      image becomes the last one
+        """
+        x_coord_of_first_img = self.positions[self.first_image_index]
+
+        if x_coord_of_first_img < -self.width-2:  # out of the screen
+            increment = 2*self.width - 5
+            # shift to the right side of the last background image
+
+            self.positions[self.first_image_index] = x_coord_of_first_img + increment
+            self.first_image_index = (self.first_image_index + 1) % len(self.positions)
@@ -0,0 +1,96 @@
+import queue
+import sys
+import threading
+import traceback
+
+
+class BackgroundWriter:
+    """
+    This class runs the disk work of `Backend` (reading and writing the
+    highscore, the replays and the leaderboard) on a thread of its own, so
+    the game never freezes while a slow disk is busy.
+
+    Jobs are functions run one after the other, in the order they were
+    submitted. The queue of jobs is bounded: if it is full, `submit()` waits
+    until there's room, so a stuck disk can't make it grow forever.
+
+    tkinter must only be used from the thread running `mainloop()`, so the
+    results of the jobs aren't handed to their callbacks right away. They
+    wait in `self.completed` until that thread calls `deliver_completed()`
+    (`App.game_loop()` does it on every frame).
+    """
+
+    def __init__(self, max_jobs=64):
+        """
+- `max_jobs`: the maximum amount of jobs waiting in `self.jobs`
+- `self.completed`: `(callback, value)` pairs waiting for `self.deliver_completed()`
+        """
+        self.jobs = queue.Queue(maxsize=max_jobs)
+        self.completed = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="BackgroundWriter", daemon=True)
+        self.thread.start()
+
+    def submit(self, job, on_done=None):
+        """
+Adds `job` (a function without arguments) to the queue
+    - once it finished, `on_done(result)` is called by `self.deliver_completed()`
+        """
+        self.jobs.put((job, on_done))
+
+    def run(self):
+        """
+The loop of the writer thread, which runs the jobs forever
+    - if a job raises an exception, it is handed to the thread that calls
+      `self.deliver_completed()` instead of calling its `on_done`, so
+      errors (and `sys.exit()`) aren't silently lost in this thread
+        """
+        while True:
+            job, on_done = self.jobs.get()
+            try:
+                result = job()
+            except BaseException as error:
+                self.completed.put((self.raise_error, error))
+            else:
+                if on_done is not None:
+                    self.completed.put((on_done, result))
+            finally:
+                self.jobs.task_done()
+
+    @staticmethod
+    def raise_error(error):
+        """
+- The callback of a job that failed: raises its `error` on the tkinter thread, see `self.deliver_completed()`
+        """
+        raise error
+
+    def deliver_completed(self):
+        """
+Calls the callbacks of all the jobs that finished since the last call,
+must be called from the tkinter thread
+    - an error of a job (or of a callback) is printed with its traceback
+      and the next callbacks are still called, so one failed disk write
+      can't stop the game loop that delivers them
+    - `sys.exit()` and Ctrl+C (`SystemExit`, `KeyboardInterrupt`) are
+      raised again, they aren't errors
+        """
+        while not self.completed.empty():
+            callback, value = self.completed.get()
+            try:
+                callback(value)
+            except Exception as error:
+                print("a background job of the game failed:", file=sys.stderr)
+                traceback.print_exception(error)
+
+    def wait(self):
+        """
+Waits until every submitted job has finished
+        """
+        self.jobs.join()
+
+    def flush(self):
+        """
+Waits until every submitted job has finished and calls their callbacks,
+must be called from the tkinter thread
+        """
+        self.wait()
+        self.deliver_completed()